@@ -1,12 +1,36 @@
 #!/usr/bin/env python3
-"""像素画生成器 - Web 入口"""
+"""像素画生成器 - Web 入口
 
-from src.web.app import create_app
+环境变量 PIXEL_QUEUE 指定任务队列数据库路径时启用 /v1/jobs，渲染交给
+`python main.py worker` 工作进程；队列位于多机共享存储上时另设 PIXEL_QUEUE_SHARED=1。
+PIXEL_MEMORY_BUDGET 为所有进行中渲染的估算内存上限（MB），默认 1536。
+设置 PIXEL_ADMIN_TOKEN 时开放 /v1/admin 管理接口（按需性能分析），分析结果写入
+PIXEL_PROFILE_DIR（默认 data/profiles）。
+"""
+
+import os
+
+from src.engine.profiling import PROFILE_DIR
+from src.web.app import PixelArtApp, create_app
+from src.web.api import create_api_router
+from src.web.jobs import JobQueue
+from src.web.memory import MEMORY_BUDGET
+
+MAX_THREADS = 4  # 内存由预算准入控制（src/web/memory.py），并发只按 CPU 限制
 
 if __name__ == "__main__":
-    demo = create_app()
+    budget_mb = os.environ.get("PIXEL_MEMORY_BUDGET")
+    pixel_app = PixelArtApp(memory_budget=int(budget_mb) * 2**20 if budget_mb else MEMORY_BUDGET,
+                            profile_dir=os.environ.get("PIXEL_PROFILE_DIR", PROFILE_DIR))
+    demo = create_app(app=pixel_app)
+    queue_path = os.environ.get("PIXEL_QUEUE")
+    jobs = JobQueue(queue_path, shared=os.environ.get("PIXEL_QUEUE_SHARED") == "1") if queue_path else None
+    # HTTP API 路由挂在 Gradio 底层的 FastAPI 应用上，与界面共用端口
+    api_router = create_api_router(pixel_app, max_workers=MAX_THREADS, jobs=jobs,
+                                   admin_token=os.environ.get("PIXEL_ADMIN_TOKEN"))
     demo.launch(
         server_name="0.0.0.0",
         server_port=7860,
-        max_threads=2  # 限制并发，防止内存耗尽
+        max_threads=MAX_THREADS,
+        app_kwargs={"routes": api_router.routes}
     )
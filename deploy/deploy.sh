@@ -8,7 +8,7 @@ echo "=== 像素画生成器部署脚本 ==="
 # 1. 更新系统并安装依赖
 echo "[1/4] 安装系统依赖..."
 sudo apt update
-sudo apt install -y python3 python3-pip python3-venv
+sudo apt install -y python3 python3-pip python3-venv curl
 
 # 2. 创建虚拟环境
 echo "[2/4] 创建 Python 虚拟环境..."
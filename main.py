@@ -1,17 +1,28 @@
 #!/usr/bin/env python3
-"""像素画生成器 - CLI 入口"""
+"""像素画生成器 - CLI 入口
+
+渲染引擎在用到时才导入：有常驻进程（`main.py serve`）时命令行请求直接转发，
+客户端不加载 PIL / NumPy。
+"""
 
 import argparse
+import os
 import sys
+from contextlib import nullcontext
 
-from src.engine.renderer import Renderer, Config
-from src.ui.interactive import interactive_session
+from src import daemon
 
 DEFAULT_IMAGE = "data/bg2.jpg"
+RESIDENT_IMAGE_CACHE = 4  # 常驻进程保留的已解码图片数
+# --out 按扩展名选择格式：png 为字符画图像，svgz 为 gzip 压缩的 SVG
+OUTPUT_FORMATS = {".png": "png", ".html": "html", ".htm": "html", ".ans": "ansi",
+                  ".svg": "svg", ".svgz": "svg"}
 
 
-def run_cli(args, config: Config, renderer: Renderer):
+def run_cli(args, config: "Config", renderer: "Renderer"):
     """命令行模式"""
+    from src.engine.graphics import GRAPHICS_PROTOCOLS, detect_graphics
+
     try:
         img = renderer.load_image(args.image)
     except FileNotFoundError:
@@ -51,24 +62,205 @@ def run_cli(args, config: Config, renderer: Renderer):
     invert = args.invert or defaults.get("invert", False)
     do_clear = args.clear or defaults.get("clear", False)
 
-    # 准备图片
     mode = template.get("mode", "pixel_raw")
+    if args.out:
+        full_img = renderer.prepare_image(img, width, aspect, mode)
+        if not write_outputs(args.out, full_img, template, glyph_variant, invert, renderer):
+            sys.exit(1)
+        if not args.quiet:
+            print(f"[完成] 预设={template['id']}, 尺寸={full_img.size[0]}x{full_img.size[1]}, "
+                  f"已保存: {', '.join(args.out)}")
+        return
+
+    # 终端图形协议：auto 时检测，不支持则回退到字符模式
+    protocol = None
+    if args.graphics == "auto":
+        protocol = detect_graphics()
+        if protocol is None and not args.quiet:
+            print("[INFO] 终端不支持 Sixel / kitty 图形协议，使用字符模式")
+    elif args.graphics in GRAPHICS_PROTOCOLS:
+        protocol = args.graphics
+
+    if protocol:
+        if not args.quiet:
+            print(f"渲染中... (预设={template['id']}, 图形协议={protocol})")
+        size = renderer.render_graphics(img, template, width, aspect, protocol, do_clear)
+        if not args.quiet:
+            print(f"[完成] 预设={template['id']}, 图形协议={protocol}, 采样={size[0]}x{size[1]}")
+        return
+
+    # 准备图片
     full_img = renderer.prepare_image(img, width, aspect, mode)
 
     # 渲染
-    print(f"渲染中... (预设={template['id']}, 尺寸={full_img.size[0]}x{full_img.size[1]})")
+    if not args.quiet:
+        print(f"渲染中... (预设={template['id']}, 尺寸={full_img.size[0]}x{full_img.size[1]})")
     renderer.render(full_img, template, glyph_variant, delay, invert, do_clear)
 
-    glyph_id = glyph_variant.get("id", "default") if glyph_variant else "N/A"
-    print(f"\n[完成] 预设={template['id']}, 样式={glyph_id}, 尺寸={full_img.size[0]}x{full_img.size[1]}")
+    if not args.quiet:
+        glyph_id = glyph_variant.get("id", "default") if glyph_variant else "N/A"
+        print(f"\n[完成] 预设={template['id']}, 样式={glyph_id}, 尺寸={full_img.size[0]}x{full_img.size[1]}")
+
+
+def write_outputs(paths: list, full_img, template: dict, glyph_variant: dict,
+                  invert: bool, renderer: "Renderer") -> bool:
+    """按扩展名把渲染结果直接写入文件，不向终端输出；任一文件失败时返回 False
+
+    字符数据（png / svg）与 ANSI 行（ans / html）各只渲染一次，只在有格式需要时渲染。
+    """
+    from src.engine.exporter import export_ansi, export_char_png, export_html, export_svg
+    from src.engine.modes import render_cells
+
+    mode = template.get("mode", "pixel_raw")
+    title = f"Pixel Art - {template['id']}"
+    char_data = lines = None
+    ok = True
+    for path in paths:
+        fmt = OUTPUT_FORMATS[os.path.splitext(path)[1].lower()]
+        if fmt in ("png", "svg") and char_data is None:
+            glyph = glyph_variant.get("glyph", "█") if glyph_variant else "█"
+            charset = glyph_variant.get("charset", "") if glyph_variant else ""
+            char_data = render_cells(full_img, mode, glyph, charset, invert,
+                                     template.get("dither", "none"))
+        if fmt in ("ansi", "html") and lines is None:
+            lines = renderer.render(full_img, template, glyph_variant, invert=invert,
+                                    return_lines=True) or []
+
+        if fmt == "png":
+            ok = export_char_png(char_data, path) and ok
+        elif fmt == "svg":
+            ok = export_svg(char_data, path, title=title) and ok
+        elif fmt == "html":
+            ok = export_html(lines, path, title=title) and ok
+        else:
+            ok = export_ansi(lines, path) and ok
+    return ok
+
+
+def run_worker_cli(argv: list):
+    """工作进程模式：从任务队列领取渲染任务"""
+    parser = argparse.ArgumentParser(prog="main.py worker", description="像素画渲染工作进程")
+    parser.add_argument("--queue", "-q", default=os.environ.get("PIXEL_QUEUE", "data/queue.db"),
+                        help="任务队列数据库路径（默认取环境变量 PIXEL_QUEUE）")
+    parser.add_argument("--id", help="工作进程标识（默认 主机名-PID）")
+    parser.add_argument("--poll", type=float, default=1.0, help="队列为空时的轮询间隔（秒）")
+    parser.add_argument("--shared-storage", action="store_true",
+                        default=os.environ.get("PIXEL_QUEUE_SHARED") == "1",
+                        help="队列位于多机共享存储上（不使用 WAL）")
+    parser.add_argument("--once", action="store_true", help="队列清空后退出")
+    args = parser.parse_args(argv)
+
+    # 延迟导入：只有工作进程需要 Web 渲染依赖
+    from src.web.worker import run_worker
+    run_worker(args.queue, args.id, args.poll, args.shared_storage, args.once)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """命令行模式的参数解析器"""
+    from src.engine.graphics import GRAPHICS_PROTOCOLS
+    from src.engine.profiling import PROFILE_DIR
+
+    parser = argparse.ArgumentParser(prog="main.py", description="像素画生成器")
+    parser.add_argument("image", help="图片路径")
+    parser.add_argument("--preset", "-p", help="预设模板 ID")
+    parser.add_argument("--glyph", "-g", help="字符样式 ID")
+    parser.add_argument("--mode", "-m", choices=["fg", "bg", "half", "mono"], help="兼容旧模式")
+    parser.add_argument("--width", "-w", type=int, help="输出宽度")
+    parser.add_argument("--aspect", "-a", type=float, help="宽高比校正")
+    parser.add_argument("--delay", "-d", type=float, help="每行延迟(ms)")
+    parser.add_argument("--invert", "-i", action="store_true", help="反转亮度")
+    parser.add_argument("--clear", action="store_true", help="渲染前清屏")
+    parser.add_argument("--graphics", choices=["off", "auto", *GRAPHICS_PROTOCOLS], default="off",
+                        help="终端图形协议输出（auto 自动检测，不支持时回退字符模式）")
+    parser.add_argument("--out", "-o", action="append",
+                        help="直接写入文件、不在终端渲染，格式按扩展名 "
+                             f"({' / '.join(OUTPUT_FORMATS)})，可重复指定")
+    parser.add_argument("--quiet", "-q", action="store_true", help="不输出进度与完成信息")
+    parser.add_argument("--profile", nargs="?", const=PROFILE_DIR, metavar="DIR",
+                        help=f"性能分析：写出 .pstats 与火焰图用的 .folded 文件（默认目录 {PROFILE_DIR}）")
+    parser.add_argument("--local", action="store_true", help="不使用常驻进程，在本进程渲染")
+    return parser
+
+
+def run_command(argv: list, config: "Config", renderer: "Renderer"):
+    """执行一次命令行模式请求（本进程，或常驻进程内代客户端执行）"""
+    from src.engine.profiling import capture
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    for path in args.out or ():
+        if os.path.splitext(path)[1].lower() not in OUTPUT_FORMATS:
+            parser.error(f"不支持的输出格式: {path}")
+    name = "cli-" + (args.preset or args.mode or config.templates[0]["id"])
+    with capture(name, args.profile) if args.profile else nullcontext() as profile:
+        run_cli(args, config, renderer)
+    if profile is not None and not args.quiet:
+        print(f"[INFO] 性能分析已保存: {profile['pstats']}，火焰图: {profile['folded']}")
+
+
+def needs_local(argv: list) -> bool:
+    """必须在本进程执行的请求：指定了 --local，或要用终端图形协议（需要查询调用方的终端）"""
+    for i, arg in enumerate(argv):
+        if arg == "--local":
+            return True
+        if arg == "--graphics" or arg.startswith("--graphics="):
+            value = arg.partition("=")[2] or (argv[i + 1] if i + 1 < len(argv) else "")
+            if value != "off":
+                return True
+    return False
+
+
+def run_serve_cli(argv: list):
+    """常驻进程模式：保持引擎预热，在 Unix 域套接字上执行命令行请求"""
+    parser = argparse.ArgumentParser(prog="main.py serve", description="像素画 CLI 常驻进程")
+    parser.add_argument("--socket", "-s", default=daemon.default_socket_path(),
+                        help="套接字路径（默认取环境变量 PIXEL_SOCKET，否则为 $XDG_RUNTIME_DIR/pixel-art.sock，"
+                             "或临时目录下当前用户私有的 pixel-art-<uid>/daemon.sock）")
+    args = parser.parse_args(argv)
+
+    from PIL import Image
+    from src.engine.glyphs import FONT_SIZE, load_font
+    from src.engine.modes import render_cells
+    from src.engine.renderer import Config, Renderer
+
+    config = Config()
+    renderer = Renderer(config, image_cache=RESIDENT_IMAGE_CACHE)
+    # 预热：PIL 编解码插件、字体、各模板一次极小渲染
+    Image.init()
+    load_font(FONT_SIZE)
+    sample = Image.linear_gradient("L").resize((64, 48)).convert("RGB")
+    for template in config.templates:
+        mode = template.get("mode", "pixel_raw")
+        small = renderer.prepare_image(sample, 16, 0.5, mode)
+        variant = config.get_glyph_variant(template.get("glyph_family", ""))
+        renderer.render(small, template, variant, return_lines=True)
+        render_cells(small, mode, variant.get("glyph", "█"), variant.get("charset", ""))
+
+    daemon.serve(lambda command: run_command(command, config, renderer), args.socket)
 
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "worker":
+        run_worker_cli(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        run_serve_cli(sys.argv[2:])
+        return
+
+    # 命令行模式：有常驻进程时交给它执行，否则在本进程渲染
+    argv = sys.argv[1:]
+    if argv and not needs_local(argv):
+        code = daemon.run_remote(argv)
+        if code is not None:
+            sys.exit(code)
+
+    from src.engine.renderer import Config, Renderer
     config = Config()
     renderer = Renderer(config)
 
-    # 无参数时进入交互模式
-    if len(sys.argv) == 1:
+    # 无参数时进入交互模式（延迟导入：保存对话框会加载 tkinter，命令行导出不需要）
+    if not argv:
+        from src.ui.interactive import interactive_session
         try:
             while True:
                 interactive_session(renderer, config, DEFAULT_IMAGE)
@@ -78,20 +270,12 @@ def main():
             print("\n")
         return
 
-    # 命令行模式
-    parser = argparse.ArgumentParser(description="像素画生成器")
-    parser.add_argument("image", help="图片路径")
-    parser.add_argument("--preset", "-p", help="预设模板 ID")
-    parser.add_argument("--glyph", "-g", help="字符样式 ID")
-    parser.add_argument("--mode", "-m", choices=["fg", "bg", "half", "mono"], help="兼容旧模式")
-    parser.add_argument("--width", "-w", type=int, help="输出宽度")
-    parser.add_argument("--aspect", "-a", type=float, help="宽高比校正")
-    parser.add_argument("--delay", "-d", type=float, help="每行延迟(ms)")
-    parser.add_argument("--invert", "-i", action="store_true", help="反转亮度")
-    parser.add_argument("--clear", action="store_true", help="渲染前清屏")
-
-    args = parser.parse_args()
-    run_cli(args, config, renderer)
+    try:
+        run_command(argv, config, renderer)
+    except BrokenPipeError:
+        # 输出被截断（如 | head），与常驻进程模式一样静默退出
+        daemon.discard_stdout()
+        sys.exit(1)
 
 
 if __name__ == "__main__":
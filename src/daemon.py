@@ -0,0 +1,277 @@
+"""像素画生成器 - CLI 常驻进程
+
+`python main.py serve` 启动一个常驻进程，引擎、字体、已解码的图片留在内存中，
+在 Unix 域套接字上逐个执行命令行请求；`python main.py <图片> ...` 发现常驻进程时
+只转发参数并把输出原样写回终端，省去每次启动解释器、导入 PIL / NumPy 与加载
+配置字体的时间。没有常驻进程（或平台不支持 Unix 域套接字）时由调用方在本进程渲染。
+
+本模块只依赖标准库，客户端路径不导入渲染引擎。
+
+套接字默认放在 $XDG_RUNTIME_DIR，或临时目录下当前用户私有（0700）的目录中；客户端
+只连接属于当前用户的套接字（文件属主，Linux 上另查对端进程的 SO_PEERCRED），
+检查不通过时在本进程渲染，命令行参数与终端输出不会交给其他用户的进程。
+
+协议：双方交换帧，帧头为 1 字节类型 + 4 字节大端长度。
+
+    R  请求    JSON {"argv": [...], "cwd": 工作目录}
+    O  标准输出数据      E  标准错误数据      X  退出码（4 字节有符号整数），之后关闭连接
+"""
+
+import io
+import json
+import os
+import signal
+import socket
+import stat
+import struct
+import sys
+import tempfile
+import threading
+
+_HEADER = struct.Struct(">cI")
+ACCEPT_TIMEOUT = 0.5  # accept 超时，便于及时响应退出信号（秒）
+OUTPUT_BUFFER = 64 * 1024
+
+
+def _uid() -> int:
+    return os.getuid() if hasattr(os, "getuid") else 0
+
+
+def _private_dir() -> str:
+    """没有 XDG_RUNTIME_DIR 时存放套接字的目录：临时目录下按用户区分，权限 0700"""
+    return os.path.join(tempfile.gettempdir(), f"pixel-art-{_uid()}")
+
+
+def default_socket_path() -> str:
+    """套接字路径：环境变量 PIXEL_SOCKET；否则为 $XDG_RUNTIME_DIR/pixel-art.sock，
+    没有 XDG_RUNTIME_DIR 时为私有目录（见 _private_dir）下的 daemon.sock"""
+    if os.environ.get("PIXEL_SOCKET"):
+        return os.environ["PIXEL_SOCKET"]
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, "pixel-art.sock")
+    return os.path.join(_private_dir(), "daemon.sock")
+
+
+def _make_private_dir(path: str):
+    """创建只有当前用户可访问的目录；已存在但属于其他用户或对其他用户开放时拒绝使用"""
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != _uid() or st.st_mode & 0o077:
+        raise RuntimeError(f"套接字目录不属于当前用户或权限过宽: {path}")
+
+
+def _owned_by_current_user(path: str) -> bool:
+    """path 是否为当前用户创建的套接字文件（不跟随符号链接）"""
+    st = os.lstat(path)
+    return stat.S_ISSOCK(st.st_mode) and st.st_uid == _uid()
+
+
+def _peer_is_current_user(conn: socket.socket) -> bool:
+    """对端进程是否以当前用户运行；不支持 SO_PEERCRED 的平台只依赖套接字文件属主"""
+    if not hasattr(socket, "SO_PEERCRED"):
+        return True
+    creds = struct.Struct("3i")  # pid, uid, gid
+    _, uid, _ = creds.unpack(conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, creds.size))
+    return uid == _uid()
+
+
+def discard_stdout():
+    """标准输出的读端已关闭（如管道给 head）：其余输出改写到 /dev/null，
+    避免解释器退出时刷新缓冲再次报错"""
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, sys.stdout.fileno())
+    os.close(devnull)
+
+
+def _send(conn: socket.socket, kind: bytes, payload: bytes):
+    conn.sendall(_HEADER.pack(kind, len(payload)) + payload)
+
+
+def _recv_exact(conn: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("连接已关闭")
+        data += chunk
+    return bytes(data)
+
+
+def _recv(conn: socket.socket) -> tuple:
+    kind, size = _HEADER.unpack(_recv_exact(conn, _HEADER.size))
+    return kind, _recv_exact(conn, size)
+
+
+class _FrameStream(io.RawIOBase):
+    """把写入的字节按帧发送到连接；连接断开后首次写入抛出 OSError，之后的写入直接丢弃"""
+
+    def __init__(self, conn: socket.socket, kind: bytes):
+        self.conn = conn
+        self.kind = kind
+        self.broken = False
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if not self.broken:
+            try:
+                _send(self.conn, self.kind, bytes(data))
+            except OSError:
+                self.broken = True
+                raise
+        return len(data)
+
+
+def _text_stream(conn: socket.socket, kind: bytes) -> io.TextIOWrapper:
+    return io.TextIOWrapper(io.BufferedWriter(_FrameStream(conn, kind), OUTPUT_BUFFER),
+                            encoding="utf-8", errors="replace")
+
+
+def run_remote(argv: list, path: str = None):
+    """把一次命令行请求交给常驻进程执行，返回退出码；没有可用的常驻进程时返回 None
+
+    套接字或对端进程不属于当前用户时不发送请求，提示后返回 None（改为本进程渲染）。
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    path = path or default_socket_path()
+    try:
+        owned = _owned_by_current_user(path)
+    except OSError:
+        return None
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(path)
+        trusted = owned and _peer_is_current_user(conn)
+    except OSError:
+        conn.close()
+        return None
+    if not trusted:
+        conn.close()
+        print(f"[WARN] 套接字不属于当前用户，已忽略: {path}", file=sys.stderr)
+        return None
+
+    with conn:
+        _send(conn, b"R", json.dumps({"argv": argv, "cwd": os.getcwd()}).encode("utf-8"))
+        sys.stdout.flush()
+        outputs = {b"O": sys.stdout.buffer, b"E": sys.stderr.buffer}
+        received = False
+        while True:
+            try:
+                kind, payload = _recv(conn)
+            except ConnectionError:
+                # 常驻进程在开始输出前退出：改为本进程渲染；输出到一半则视为失败
+                return 1 if received else None
+            received = True
+            if kind == b"X":
+                return struct.unpack(">i", payload)[0]
+            out = outputs.get(kind)
+            if out is not None:
+                try:
+                    out.write(payload)
+                    out.flush()
+                except BrokenPipeError:
+                    # 输出被截断（如 | head）：断开连接，常驻进程丢弃其余输出
+                    if out is sys.stdout.buffer:
+                        discard_stdout()
+                    return 1
+
+
+def serve(handle, path: str = None, log=print):
+    """在 path 上逐个执行请求，直到收到 SIGTERM / SIGINT
+
+    handle(argv) 在本进程执行一次命令行请求，期间标准输出 / 错误被转发给客户端，
+    工作目录切换为客户端的工作目录；sys.exit 的退出码原样返回给客户端。
+    """
+    path = path or default_socket_path()
+    if os.path.dirname(path) == _private_dir():
+        _make_private_dir(_private_dir())
+    if os.path.exists(path):
+        if _is_listening(path):
+            raise RuntimeError(f"常驻进程已在运行: {path}")
+        os.unlink(path)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o177)  # 套接字只允许当前用户连接
+    try:
+        server.bind(path)
+    finally:
+        os.umask(old_umask)
+    server.listen(16)
+    server.settimeout(ACCEPT_TIMEOUT)
+
+    stopping = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stopping.set())
+
+    log(f"[OK] 常驻进程已启动: {path}")
+    try:
+        while not stopping.is_set():
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                continue
+            with conn:
+                conn.settimeout(None)
+                _handle_connection(conn, handle, log)
+    finally:
+        server.close()
+        if os.path.exists(path):
+            os.unlink(path)
+        log("[OK] 常驻进程已退出")
+
+
+def _is_listening(path: str) -> bool:
+    """path 上是否有常驻进程在监听"""
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+
+def _handle_connection(conn: socket.socket, handle, log):
+    """执行一个请求：转发输出，结束时发送退出码"""
+    try:
+        kind, payload = _recv(conn)
+        request = json.loads(payload) if kind == b"R" else None
+    except (ConnectionError, ValueError):
+        return
+    if not request:
+        return
+
+    stdout, stderr = _text_stream(conn, b"O"), _text_stream(conn, b"E")
+    saved = sys.stdout, sys.stderr, os.getcwd()
+    code = 0
+    try:
+        os.chdir(request.get("cwd") or saved[2])
+        sys.stdout, sys.stderr = stdout, stderr
+        handle(list(request.get("argv", [])))
+    except SystemExit as e:
+        if isinstance(e.code, str):
+            print(e.code, file=stderr)
+            code = 1
+        else:
+            code = e.code or 0
+    except Exception as e:
+        print(f"[ERR] {type(e).__name__}: {e}", file=stderr)
+        code = 1
+    finally:
+        sys.stdout, sys.stderr = saved[0], saved[1]
+        os.chdir(saved[2])
+
+    try:
+        stdout.flush()
+        stderr.flush()
+        _send(conn, b"X", struct.pack(">i", code))
+    except OSError:
+        # 客户端中途断开（如输出被 head 截断）
+        log("[WARN] 客户端已断开，请求输出被丢弃")
@@ -1,5 +1,7 @@
 from .ansi import fg, bg, reset, clear_screen
 from .preprocess import resize, center_crop, brightness
-from .modes import MODE_REGISTRY, render_to_html_data
+from .buffers import image_from_buffer, open_raw
+from .graphics import encode_sixel, encode_kitty, detect_graphics
+from .modes import MODE_REGISTRY, render_to_html_data, render_cells, cells_to_html
 from .renderer import Config, Renderer
 from .exporter import export_png, export_char_png, export_html, export_ansi
@@ -0,0 +1,81 @@
+"""缓冲区输入 - 从 NumPy 数组、memoryview、bytes 或内存映射文件构建图像
+
+供嵌入引擎的调用方直接传入已解码的帧，避免 PIL 往返和多余拷贝：
+对 PIL 可直接映射的布局（L / RGBA / RGBX），图像直接引用原缓冲区；
+RGB 三通道由 PIL 的 raw 解码器按行读取一次，不产生中间对象。
+后续 prepare_image 先缩放再转换为 RGB，只处理缩小后的图像。
+"""
+
+import mmap
+
+from PIL import Image
+
+# 通道数 -> PIL 模式
+CHANNEL_MODES = {1: "L", 3: "RGB", 4: "RGBA"}
+
+
+def _from_array(arr) -> Image.Image:
+    """从 NumPy 数组（形状 (h, w) 或 (h, w, c)，uint8）构建图像"""
+    import numpy as np
+
+    if arr.dtype != np.uint8:
+        raise ValueError(f"仅支持 uint8 数组，收到 {arr.dtype}")
+    if arr.ndim == 2:
+        arr = arr[:, :, None]
+    if arr.ndim != 3 or arr.shape[2] not in CHANNEL_MODES:
+        raise ValueError(f"不支持的数组形状: {arr.shape}")
+
+    h, w, channels = arr.shape
+    row_stride, pixel_stride, channel_stride = arr.strides
+    if (pixel_stride != channels or (channels > 1 and channel_stride != 1)
+            or row_stride < w * channels or not _spans_rows(arr, h * row_stride)):
+        # 像素内不连续（如通道切片、转置）或末行之后没有完整行跨度，只能整理为连续数组
+        arr = np.ascontiguousarray(arr)
+        row_stride = w * channels
+
+    # 行间可以有间隔（如裁剪大帧的一部分）：构造覆盖所有行的一维视图，不复制数据
+    flat = np.lib.stride_tricks.as_strided(arr, shape=(h * row_stride,), strides=(1,))
+    return image_from_buffer(flat, (w, h), channels, row_stride)
+
+
+def _spans_rows(arr, nbytes: int) -> bool:
+    """从数组起点算起的 nbytes 字节是否都落在其底层内存内"""
+    root = arr
+    while isinstance(root.base, type(arr)):
+        root = root.base
+    root_end = root.__array_interface__["data"][0] + root.itemsize + sum(
+        (n - 1) * st for n, st in zip(root.shape, root.strides) if st > 0)
+    return arr.__array_interface__["data"][0] + nbytes <= root_end
+
+
+def image_from_buffer(buf, size: tuple = None, channels: int = None,
+                      stride: int = 0) -> Image.Image:
+    """从支持缓冲区协议的对象构建图像
+
+    NumPy 数组可直接传入，尺寸与行跨度从数组读取；bytes / bytearray /
+    memoryview / mmap 需给出 size=(w, h) 与 channels，stride 为每行字节数
+    （0 表示紧密排列）。
+    """
+    if hasattr(buf, "__array_interface__") and size is None:
+        return _from_array(buf)
+
+    if size is None or channels is None:
+        raise ValueError("原始缓冲区需要提供 size 和 channels")
+    mode = CHANNEL_MODES.get(channels)
+    if mode is None:
+        raise ValueError(f"不支持的通道数: {channels}")
+
+    w, h = size
+    stride = stride or w * channels
+    needed = h * stride
+    if memoryview(buf).nbytes < needed:
+        raise ValueError(f"缓冲区过小: 需要 {needed} 字节")
+    return Image.frombuffer(mode, size, buf, "raw", mode, stride, 1)
+
+
+def open_raw(path: str, size: tuple, channels: int = 3, offset: int = 0,
+             stride: int = 0) -> Image.Image:
+    """以内存映射方式打开原始 RGB/RGBA 帧文件，不整体读入内存"""
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return image_from_buffer(memoryview(mapped)[offset:], size, channels, stride)
@@ -0,0 +1,105 @@
+"""抖动模块 - 有序抖动 (Bayer) 与误差扩散 (Floyd–Steinberg)
+
+在字符集级别做整图抖动：把亮度量化为字符集索引，用空间上的明暗交替
+代替硬分级，低列数下也能保留渐变，减少色带。
+"""
+
+import numpy as np
+from PIL import Image
+
+DITHER_METHODS = ("none", "bayer", "floyd_steinberg")
+
+
+def _bayer_matrix(n: int) -> np.ndarray:
+    """递归生成 n×n Bayer 索引矩阵（n 为 2 的幂）"""
+    m = np.array([[0, 2], [3, 1]], dtype=np.int32)
+    while m.shape[0] < n:
+        m = np.block([[4 * m, 4 * m + 2], [4 * m + 3, 4 * m + 1]])
+    return m
+
+
+# 预计算的 8×8 阈值矩阵，取值 (0, 1)
+BAYER_THRESHOLDS = (_bayer_matrix(8) + 0.5) / 64.0
+
+
+def luminance(img: Image.Image) -> np.ndarray:
+    """整图亮度 (ITU-R BT.709)，返回 [0, 1] 的二维数组"""
+    rgb = np.asarray(img.convert("RGB"), dtype=np.float64)
+    return (0.2126 * rgb[..., 0] + 0.7152 * rgb[..., 1] + 0.0722 * rgb[..., 2]) / 255.0
+
+
+def ordered_dither(lum: np.ndarray, levels: int) -> np.ndarray:
+    """有序抖动：平铺阈值矩阵后一次性量化"""
+    h, w = lum.shape
+    n = BAYER_THRESHOLDS.shape[0]
+    thresholds = np.tile(BAYER_THRESHOLDS, (h // n + 1, w // n + 1))[:h, :w]
+    idx = np.floor(lum * (levels - 1) + thresholds)
+    return np.clip(idx, 0, levels - 1).astype(np.intp)
+
+
+def floyd_steinberg(lum: np.ndarray, levels: int) -> np.ndarray:
+    """Floyd–Steinberg 误差扩散
+
+    行内向右的 7/16 误差必须逐像素传递；向下一行的 3/16、5/16、1/16
+    在整行量化完成后用数组运算一次性累加。
+    """
+    h, w = lum.shape
+    values = lum * (levels - 1)
+    idx = np.empty((h, w), dtype=np.intp)
+    top = levels - 1
+
+    for y in range(h):
+        row = values[y].tolist()
+        q_row = [0] * w
+        errors = [0.0] * w
+        carry = 0.0
+        for x in range(w):
+            v = row[x] + carry
+            q = int(v + 0.5)
+            if q < 0:
+                q = 0
+            elif q > top:
+                q = top
+            q_row[x] = q
+            err = v - q
+            errors[x] = err
+            carry = err * 0.4375
+        idx[y] = q_row
+
+        if y + 1 < h:
+            err = np.asarray(errors)
+            below = values[y + 1]
+            below += err * 0.3125
+            below[:-1] += err[1:] * 0.1875
+            below[1:] += err[:-1] * 0.0625
+
+    return idx
+
+
+def dither_indices(img: Image.Image, levels: int, method: str,
+                   invert: bool = False) -> np.ndarray:
+    """按抖动方式把整图亮度量化为 0..levels-1 的索引"""
+    return quantize(luminance(img), levels, method, invert)
+
+
+def quantize(lum: np.ndarray, levels: int, method: str,
+             invert: bool = False) -> np.ndarray:
+    """按抖动方式把亮度平面量化为 0..levels-1 的索引（lum 不会被修改）"""
+    if invert:
+        lum = 1.0 - lum
+    if levels <= 1:
+        return np.zeros(lum.shape, dtype=np.intp)
+    if method == "bayer":
+        return ordered_dither(lum, levels)
+    if method == "floyd_steinberg":
+        return floyd_steinberg(lum, levels)
+    if method == "none":
+        return np.minimum((lum * (levels - 1)).astype(np.intp), levels - 1)
+    raise ValueError(f"未知抖动方式: {method}")
+
+
+def dither_chars(img: Image.Image, charset: str, method: str,
+                 invert: bool = False) -> list:
+    """整图抖动后映射为字符，返回按行的字符列表"""
+    idx = dither_indices(img, len(charset), method, invert)
+    return np.array(list(charset))[idx].tolist()
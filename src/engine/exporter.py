@@ -1,10 +1,51 @@
-"""导出模块 - PNG/HTML/ANSI 导出功能"""
+"""导出模块 - PNG/HTML/ANSI/SVG 导出功能"""
 
+import gzip
+import html
 import re
-from PIL import Image, ImageDraw, ImageFont
+from functools import lru_cache
+
+from PIL import Image, ImageDraw
+
+from .glyphs import BLOCK_CHARS, BLOCK_GRIDS, BRAILLE_GRID, braille_dots, load_font
 
 CHAR_WIDTH = 8
 CHAR_HEIGHT = 14
+DEFAULT_BG = (30, 30, 30)
+HTML_CHUNK_ROWS = 16  # HTML 导出每个行块的行数
+
+# 行块样式：离开视口的块跳过布局与绘制，按行数 / 列数预留尺寸，滚动条长度不变。
+# content-visibility 会裁剪超出元素宽度的内容，行块宽度须随内容（宽幅字符画远宽于页面）
+CHUNK_CSS = "pre { margin: 0; } pre.chunk { content-visibility: auto; width: max-content; }"
+_TAG_RE = re.compile(r"<[^>]*>")
+
+
+def _mask_shapes(mask: int, grid: tuple) -> tuple:
+    """子像素掩码转为矩形：每行连续的点亮子像素合并，跨度相同的相邻行再合并"""
+    gw, gh = grid
+    spans = []
+    for row in range(gh):
+        cols = [col for col in range(gw) if mask >> (row * gw + col) & 1]
+        span = (cols[0], cols[-1] + 1) if cols else None
+        if span and spans and spans[-1][0] == span and spans[-1][2] == row:
+            spans[-1][2] = row + 1
+        elif span:
+            spans.append([span, row, row + 1])
+    return tuple((x0 / gw, y0 / gh, x1 / gw, y1 / gh) for (x0, x1), y0, y1 in spans)
+
+
+# 可直接用矩形绘制的块字符（█▀▄▌▐ 与全部象限块、六分块）：单元格内的 (x0, y0, x1, y1)，
+# 单位为单元格比例；导出时不依赖字体是否包含这些字形
+BLOCK_SHAPES = {
+    char: _mask_shapes(mask, BLOCK_GRIDS[mode])
+    for mode, chars in BLOCK_CHARS.items() for mask, char in enumerate(chars) if mask
+}
+# 所有矩形都占满单元格宽度的块字符（█▀▄ 等），同色相邻单元格可横向合并为一个矩形
+MERGEABLE_BLOCKS = frozenset(
+    char for char, shapes in BLOCK_SHAPES.items()
+    if all(x0 == 0 and x1 == 1 for x0, _, x1, _ in shapes)
+)
+BRAILLE_DOT = CHAR_WIDTH // 4  # 盲文点边长（像素）
 
 
 def export_png(img: Image.Image, path: str) -> bool:
@@ -17,8 +58,8 @@ def export_png(img: Image.Image, path: str) -> bool:
         return False
 
 
-def export_char_png(char_data: list, path: str) -> bool:
-    """导出字符画为 PNG 图像"""
+def export_char_png(char_data: list, path) -> bool:
+    """导出字符画为 PNG 图像，path 可以是文件路径或可写的二进制文件对象"""
     if not char_data or not char_data[0]:
         print("[ERR] 无字符数据")
         return False
@@ -33,15 +74,7 @@ def export_char_png(char_data: list, path: str) -> bool:
         img = Image.new('RGB', (img_width, img_height), (30, 30, 30))
         draw = ImageDraw.Draw(img)
 
-        font = None
-        for font_name in ["consola.ttf", "DejaVuSansMono.ttf", "Courier New.ttf"]:
-            try:
-                font = ImageFont.truetype(font_name, 12)
-                break
-            except:
-                pass
-        if font is None:
-            font = ImageFont.load_default()
+        font = load_font(12)
 
         for y, row in enumerate(char_data):
             for x, (char, r, g, b, bg_r, bg_g, bg_b) in enumerate(row):
@@ -49,7 +82,20 @@ def export_char_png(char_data: list, path: str) -> bool:
                 py = y * CHAR_HEIGHT
                 draw.rectangle([px, py, px + CHAR_WIDTH, py + CHAR_HEIGHT],
                                fill=(bg_r, bg_g, bg_b))
-                draw.text((px, py), char, fill=(r, g, b), font=font)
+                shapes = BLOCK_SHAPES.get(char)
+                dots = None if shapes else braille_rects(char)
+                if shapes:
+                    for x0, y0, x1, y1 in shapes:
+                        draw.rectangle([px + round(x0 * CHAR_WIDTH), py + round(y0 * CHAR_HEIGHT),
+                                        px + round(x1 * CHAR_WIDTH) - 1, py + round(y1 * CHAR_HEIGHT) - 1],
+                                       fill=(r, g, b))
+                elif dots is not None:
+                    # 盲文按点位直接绘制，不依赖字体是否包含盲文字形
+                    for dx, dy, dw, dh in dots:
+                        x0, y0 = px + round(dx), py + round(dy)
+                        draw.rectangle([x0, y0, x0 + dw - 1, y0 + dh - 1], fill=(r, g, b))
+                else:
+                    draw.text((px, py), char, fill=(r, g, b), font=font)
 
         img.save(path, "PNG")
         return True
@@ -58,9 +104,151 @@ def export_char_png(char_data: list, path: str) -> bool:
         return False
 
 
+def render_svg(char_data: list, title: str = "Pixel Art") -> str:
+    """将字符数据渲染为 SVG 文本
+
+    - 背景：每行相同背景色的连续单元格合并为一个矩形
+    - 块字符（█▀▄ 等占满整行宽度的块）：同色同字符的连续单元格合并为矩形，按比例缩放不失真
+    - 象限块 / 六分块：每个单元格按子像素输出矩形
+    - 盲文字符：每个点输出为一个小方块
+    - 其它字符：每行同色字符输出为一个 <text>，x 坐标列表逐字对齐网格
+    同一颜色的所有矩形合并为一条 <path>，文字按颜色分组到 <g fill>，
+    避免逐个元素重复颜色和坐标属性。
+    """
+    rows = len(char_data)
+    cols = len(char_data[0]) if rows else 0
+    width, height = cols * CHAR_WIDTH, rows * CHAR_HEIGHT
+    bg_rects = {}
+    fg_rects = {}
+    texts = {}
+
+    for y, row in enumerate(char_data):
+        py = y * CHAR_HEIGHT
+        x = 0
+        while x < cols:
+            bg = row[x][4:7]
+            end = x + 1
+            while end < cols and row[end][4:7] == bg:
+                end += 1
+            if bg != DEFAULT_BG:
+                bg_rects.setdefault(bg, []).append((x * CHAR_WIDTH, py, (end - x) * CHAR_WIDTH, CHAR_HEIGHT))
+            x = end
+
+        x = 0
+        while x < cols:
+            char, fg = row[x][0], row[x][1:4]
+            shapes = BLOCK_SHAPES.get(char)
+            end = x + 1
+            dots = None if shapes else braille_rects(char)
+            if dots is not None:
+                fg_rects.setdefault(fg, []).extend(
+                    (x * CHAR_WIDTH + dx, py + dy, dw, dh) for dx, dy, dw, dh in dots)
+            elif shapes:
+                if char in MERGEABLE_BLOCKS:
+                    while end < cols and row[end][0] == char and row[end][1:4] == fg:
+                        end += 1
+                for x0, y0, x1, y1 in shapes:
+                    fg_rects.setdefault(fg, []).append((
+                        (x + x0) * CHAR_WIDTH, py + y0 * CHAR_HEIGHT,
+                        (end - x - 1 + x1 - x0) * CHAR_WIDTH, (y1 - y0) * CHAR_HEIGHT))
+            elif char != " ":
+                line = texts.setdefault(fg, {}).setdefault(py, ([], []))
+                line[0].append(str(x * CHAR_WIDTH))
+                line[1].append(char)
+            x = end
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" shape-rendering="crispEdges">',
+        f'<title>{_escape_html(title)}</title>',
+        f'<rect width="{width}" height="{height}" fill="{_hex(DEFAULT_BG)}"/>',
+    ]
+    for groups in (bg_rects, fg_rects):
+        for color, rects in groups.items():
+            d = "".join(f"M{_num(rx)} {_num(ry)}h{_num(rw)}v{_num(rh)}h-{_num(rw)}z"
+                        for rx, ry, rw, rh in rects)
+            parts.append(f'<path fill="{_hex(color)}" d="{d}"/>')
+    if texts:
+        parts.append('<g font-family="Consolas, Monaco, \'Courier New\', monospace" '
+                     'font-size="12" dominant-baseline="text-before-edge">')
+        for color, lines in texts.items():
+            parts.append(f'<g fill="{_hex(color)}">')
+            parts.extend(f'<text x="{" ".join(xs)}" y="{ty}">{_escape_html("".join(chars))}</text>'
+                         for ty, (xs, chars) in lines.items())
+            parts.append('</g>')
+        parts.append('</g>')
+    parts.append('</svg>')
+    return "\n".join(parts)
+
+
+def export_svg(char_data: list, path: str, title: str = "Pixel Art") -> bool:
+    """导出字符画为 SVG 矢量图，扩展名为 .svgz 时输出 gzip 压缩版本"""
+    if not char_data or not char_data[0]:
+        print("[ERR] 无字符数据")
+        return False
+
+    try:
+        content = render_svg(char_data, title).encode("utf-8")
+        if str(path).endswith(".svgz"):
+            content = gzip.compress(content, compresslevel=6)
+        with open(path, "wb") as f:
+            f.write(content)
+        return True
+    except Exception as e:
+        print(f"[ERR] SVG 导出失败: {e}")
+        return False
+
+
+@lru_cache(maxsize=256)
+def braille_rects(char: str) -> tuple:
+    """盲文字符各点在单元格内的方块 (x, y, 宽, 高)，单位为像素，非盲文字符返回 None"""
+    dots = braille_dots(char)
+    if dots is None:
+        return None
+    gw, gh = BRAILLE_GRID
+    return tuple(((col + 0.5) * CHAR_WIDTH / gw - BRAILLE_DOT / 2,
+                  (row + 0.5) * CHAR_HEIGHT / gh - BRAILLE_DOT / 2, BRAILLE_DOT, BRAILLE_DOT)
+                 for col, row in dots)
+
+
+def _hex(color: tuple) -> str:
+    """RGB 元组转 #rrggbb"""
+    return "#{:02x}{:02x}{:02x}".format(*color)
+
+
+def _num(value: float) -> str:
+    """坐标输出为最短形式（整数不带小数点）"""
+    return str(int(value)) if value == int(value) else f"{value:g}"
+
+
+def _text_width(html_line: str) -> int:
+    """HTML 行去掉标签、还原实体后的字符数（等宽字体下的列数）"""
+    return len(html.unescape(_TAG_RE.sub("", html_line)))
+
+
+def chunk_html_rows(html_lines: list, chunk_rows: int = HTML_CHUNK_ROWS) -> str:
+    """把 HTML 行拆分为多个 <pre class="chunk"> 行块，配合 CHUNK_CSS 只布局可见的行块
+
+    每块用 contain-intrinsic-height / contain-intrinsic-width 预留 行数×1em 的高度
+    （行高为 1.0）与 列数×1ch 的宽度，chunk_rows 为 0 时全部放在一个 <pre> 中。
+    """
+    lines = [line.rstrip("\n") for line in html_lines]
+    if chunk_rows <= 0:
+        return "<pre>" + "\n".join(lines) + "</pre>"
+    blocks = []
+    for i in range(0, len(lines), chunk_rows):
+        block = lines[i:i + chunk_rows]
+        cols = max(_text_width(line) for line in block)
+        blocks.append(f'<pre class="chunk" style="contain-intrinsic-width:auto {cols}ch;'
+                      f'contain-intrinsic-height:auto {len(block)}em">'
+                      + "\n".join(block) + "</pre>")
+    return "\n".join(blocks)
+
+
 def export_html(lines: list, path: str, title: str = "Pixel Art",
-                font_family: str = "Consolas, Monaco, 'Courier New', monospace") -> bool:
-    """导出为 HTML 文件"""
+                font_family: str = "Consolas, Monaco, 'Courier New', monospace",
+                chunk_rows: int = HTML_CHUNK_ROWS) -> bool:
+    """导出为 HTML 文件，默认按行块拆分以便浏览器只布局可见部分"""
     try:
         html_lines = [ansi_to_html(line) for line in lines]
 
@@ -72,10 +260,11 @@ def export_html(lines: list, path: str, title: str = "Pixel Art",
     <style>
         body {{ background-color: #1e1e1e; margin: 20px; }}
         pre {{ font-family: {font_family}; font-size: 12px; line-height: 1.0; }}
+        {CHUNK_CSS}
     </style>
 </head>
 <body>
-<pre>{"".join(html_lines)}</pre>
+{chunk_html_rows(html_lines, chunk_rows)}
 </body>
 </html>"""
         with open(path, "w", encoding="utf-8") as f:
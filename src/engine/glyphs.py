@@ -0,0 +1,147 @@
+"""字形模块 - 字体加载、字形特征矩阵与形状匹配
+
+形状匹配把每个字符栅格化为 4×8 的覆盖率特征向量（按字体/字符集缓存），
+再把图像的每个单元格与所有字形做一次批量矩阵运算，取距离最近的字形。
+
+盲文点阵（U+2800–U+28FF）每个字符 2×4 个点，按 Unicode 点位权重整图打包。
+象限块（2×2）与六分块（2×3）按子像素掩码查表得到字形。
+"""
+
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+FONT_CANDIDATES = ("consola.ttf", "DejaVuSansMono.ttf", "Courier New.ttf")
+FONT_SIZE = 12
+
+# 形状特征网格：每个单元格 4 列 × 8 行
+SHAPE_GRID = (4, 8)
+SHAPE_WEIGHT = 0.3  # 形状差相对明暗差的权重，越大越偏向轮廓
+
+# 盲文点阵网格：每个单元格 2 列 × 4 行，BRAILLE_BITS[行][列] 为该点的位权重
+BRAILLE_GRID = (2, 4)
+BRAILLE_BITS = np.array([[0x01, 0x08], [0x02, 0x10], [0x04, 0x20], [0x40, 0x80]], dtype=np.intp)
+BRAILLE_CHARS = np.array([chr(0x2800 + code) for code in range(256)])
+
+
+def _sextant_chars() -> str:
+    """六分块字形表：U+1FB00 起按掩码顺序排列，缺少的空白 / 左半 / 右半 / 全块用已有字符"""
+    existing = {0: " ", 0b010101: "▌", 0b101010: "▐", 0b111111: "█"}
+    chars, code = [], 0x1FB00
+    for mask in range(64):
+        if mask in existing:
+            chars.append(existing[mask])
+        else:
+            chars.append(chr(code))
+            code += 1
+    return "".join(chars)
+
+
+# 双色分块网格 (列, 行)：子像素按行优先编号，第 i 个子像素属于前景时掩码第 i 位为 1
+BLOCK_GRIDS = {"quadrant": (2, 2), "sextant": (2, 3)}
+BLOCK_CHARS = {
+    "quadrant": " ▘▝▀▖▌▞▛▗▚▐▜▄▙▟█",
+    "sextant": _sextant_chars(),
+}
+
+
+@lru_cache(maxsize=8)
+def load_font(size: int = FONT_SIZE) -> ImageFont.ImageFont:
+    """加载等宽字体，找不到时使用 PIL 默认字体（结果缓存）"""
+    for font_name in FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(font_name, size)
+        except OSError:
+            pass
+    return ImageFont.load_default()
+
+
+def _glyph_cell(font: ImageFont.ImageFont) -> tuple:
+    """字体的单元格尺寸 (前进宽度, 行高)"""
+    if hasattr(font, "getmetrics"):
+        ascent, descent = font.getmetrics()
+        return max(1, round(font.getlength("M"))), max(1, ascent + descent)
+    left, top, right, bottom = font.getbbox("Mg")
+    return max(1, (right - left) // 2), max(1, bottom)
+
+
+@lru_cache(maxsize=32)
+def glyph_features(charset: str, size: int = FONT_SIZE * 2) -> np.ndarray:
+    """字符集的形状特征矩阵 (len(charset), 4*8)
+
+    每个字符按字体的前进宽度与行高绘制在一个单元格内，再按 SHAPE_GRID
+    区域平均得到覆盖率；整体按最“满”的字形归一化，使全亮单元格对应
+    最密的字符。默认以 2 倍字号栅格化，避免小字号下笔画被截断。
+    """
+    font = load_font(size)
+    cell_w, cell_h = _glyph_cell(font)
+    gw, gh = SHAPE_GRID
+    features = np.zeros((len(charset), gw * gh), dtype=np.float32)
+
+    for i, char in enumerate(charset):
+        cell = Image.new("L", (cell_w, cell_h), 0)
+        ImageDraw.Draw(cell).text((0, 0), char, fill=255, font=font)
+        grid = cell.resize((gw, gh), Image.Resampling.BOX)
+        features[i] = np.asarray(grid, dtype=np.float32).reshape(-1) / 255.0
+
+    densest = features.mean(axis=1).max()
+    if densest > 0:
+        features /= densest
+    features.setflags(write=False)
+    return features
+
+
+def match_shapes(img: Image.Image, charset: str, invert: bool = False) -> list:
+    """形状匹配：img 尺寸须为 (cols*4, rows*8)，返回按行的字符列表
+
+    代价 = n·(均值差)^2 + SHAPE_WEIGHT·|去均值后的形状差|^2，前者保证明暗
+    与亮度映射一致，后者在明暗相近的字形间按轮廓取舍。展开后与单元格
+    自身相关的常数项可以省略，剩下的部分只需一次
+    (单元格数 × 32) · (32 × 字形数) 的矩阵乘法。
+    """
+    gw, gh = SHAPE_GRID
+    w, h = img.size
+    cols, rows = w // gw, h // gh
+
+    rgb = np.asarray(img.convert("RGB"), dtype=np.float32)[:rows * gh, :cols * gw]
+    lum = (0.2126 * rgb[..., 0] + 0.7152 * rgb[..., 1] + 0.0722 * rgb[..., 2]) / 255.0
+    if invert:
+        lum = 1.0 - lum
+    cells = lum.reshape(rows, gh, cols, gw).transpose(0, 2, 1, 3).reshape(rows * cols, gw * gh)
+
+    weights, bias = _shape_weights(charset)
+    idx = (cells @ weights.T - bias).argmax(axis=1).reshape(rows, cols)
+    return np.array(list(charset))[idx].tolist()
+
+
+@lru_cache(maxsize=32)
+def _shape_weights(charset: str) -> tuple:
+    """形状匹配的线性打分参数：score = cells · weights^T - bias"""
+    glyphs = glyph_features(charset)
+    n = glyphs.shape[1]
+    mean = glyphs.mean(axis=1)
+    centered = glyphs - mean[:, None]
+    weights = 2 * (SHAPE_WEIGHT * centered + mean[:, None])
+    bias = n * mean * mean + SHAPE_WEIGHT * (centered * centered).sum(axis=1)
+    return weights, bias
+
+
+def pack_braille(dots: np.ndarray) -> list:
+    """点阵打包：dots 为 (rows*4, cols*2) 的 0/1 数组，返回按行的盲文字符列表"""
+    gw, gh = BRAILLE_GRID
+    h, w = dots.shape
+    rows, cols = h // gh, w // gw
+    cells = dots[:rows * gh, :cols * gw].reshape(rows, gh, cols, gw)
+    codes = (cells * BRAILLE_BITS[None, :, None, :]).sum(axis=(1, 3))
+    return BRAILLE_CHARS[codes].tolist()
+
+
+@lru_cache(maxsize=256)
+def braille_dots(char: str) -> tuple:
+    """盲文字符的点位：单元格内的 (列, 行) 列表，非盲文字符返回 None"""
+    code = ord(char) - 0x2800 if len(char) == 1 else -1
+    if not 0 <= code < 256:
+        return None
+    return tuple((col, row) for row in range(BRAILLE_BITS.shape[0])
+                 for col in range(BRAILLE_BITS.shape[1]) if code & BRAILLE_BITS[row, col])
@@ -0,0 +1,179 @@
+"""终端图形协议 - Sixel 与 kitty 图像输出
+
+支持图形协议的终端可以直接显示像素图，字节数远少于逐单元格的真彩色转义序列：
+- Sixel：调色板量化后按 6 行一带编码，每种颜色一行位图，水平方向游程压缩
+- kitty：PNG 压缩后按 4096 字节分块 base64 传输，由终端缩放到指定单元格区域
+
+detect_graphics() 通过环境变量与终端查询判断可用协议，不支持时返回 None，
+调用方回退到字符模式。
+"""
+
+import base64
+import io
+import os
+import sys
+
+import numpy as np
+from PIL import Image
+
+GRAPHICS_PROTOCOLS = ("sixel", "kitty")
+DEFAULT_CELL_SIZE = (8, 16)  # 无法获取终端像素尺寸时假定的单元格大小
+SIXEL_COLORS = 256
+KITTY_CHUNK = 4096
+
+_BAND_WEIGHTS = (1 << np.arange(6, dtype=np.int32))[None, :, None]
+
+
+def encode_sixel(img: Image.Image, colors: int = SIXEL_COLORS, scale: tuple = (1, 1)) -> str:
+    """编码为 Sixel 序列，scale 为整数放大倍数 (横, 纵)
+
+    调色板量化后，每 6 行为一带：对带内出现的每种颜色生成 (W,) 的 6 位掩码，
+    所有颜色一次向量化计算，再按游程压缩输出。放大不生成大图：横向只把游程
+    长度乘以倍数，纵向重复调色板索引行。
+    """
+    img = img.convert("RGB")
+    sx, sy = scale
+    quantized = img.quantize(colors=colors, method=Image.Quantize.MEDIANCUT,
+                             dither=Image.Dither.NONE)
+    palette = np.array(quantized.getpalette()[:3 * colors], dtype=np.int32).reshape(-1, 3)
+    idx = np.asarray(quantized, dtype=np.int16)
+    used = np.unique(idx)
+    if sy > 1:
+        idx = np.repeat(idx, sy, axis=0)
+    h, w = idx.shape
+
+    # 高度补齐到 6 的倍数，补齐行用 -1，不属于任何颜色
+    pad = -h % 6
+    if pad:
+        idx = np.vstack([idx, np.full((pad, w), -1, dtype=np.int16)])
+
+    parts = ["\x1bPq", f'"1;1;{w * sx};{h}']
+    percent = (palette * 100 + 127) // 255
+    parts.extend(f"#{c};2;{r};{g};{b}" for c, (r, g, b) in zip(used.tolist(), percent[used].tolist()))
+
+    bands = idx.shape[0] // 6
+    for band_no in range(bands):
+        band = idx[band_no * 6:(band_no + 1) * 6]
+        band_colors = np.unique(band)
+        band_colors = band_colors[band_colors >= 0]
+        masks = ((band[None, :, :] == band_colors[:, None, None]) * _BAND_WEIGHTS).sum(axis=1)
+        rows = _sixel_runs(masks, sx)
+        parts.append("$".join(f"#{color}{row}" for color, row in zip(band_colors.tolist(), rows)))
+        if band_no < bands - 1:
+            parts.append("-")
+
+    parts.append("\x1b\\")
+    return "".join(parts)
+
+
+def _sixel_runs(masks: np.ndarray, repeat: int = 1) -> list:
+    """一带内各颜色 6 位掩码的游程编码（每列重复 repeat 次），末尾的空白列省略
+
+    所有颜色行一起求游程边界，只有拼接字符串时逐个游程循环。
+    """
+    k, w = masks.shape
+    change = np.empty((k, w), dtype=bool)
+    change[:, 0] = True
+    np.not_equal(masks[:, 1:], masks[:, :-1], out=change[:, 1:])
+    starts = np.flatnonzero(change)
+    ends = np.append(starts[1:], k * w)
+    ends = np.minimum(ends, (starts // w + 1) * w)
+    values = masks.ravel()[starts] + 63
+    keep = (values != 63) | (ends % w != 0)
+
+    out = [[] for _ in range(k)]
+    for row, value, n in zip((starts[keep] // w).tolist(), values[keep].tolist(),
+                             ((ends - starts)[keep] * repeat).tolist()):
+        char = chr(value)
+        out[row].append(char * n if n <= 3 else f"!{n}{char}")
+    return ["".join(row) for row in out]
+
+
+def encode_kitty(img: Image.Image, cols: int = 0, rows: int = 0) -> str:
+    """编码为 kitty 图形协议序列（PNG，分块 base64）
+
+    cols/rows 指定显示占用的单元格数，由终端缩放；q=2 抑制终端应答。
+    """
+    buf = io.BytesIO()
+    img.convert("RGB").save(buf, "PNG", optimize=False, compress_level=6)
+    data = base64.b64encode(buf.getvalue()).decode("ascii")
+
+    size = (f",c={cols}" if cols else "") + (f",r={rows}" if rows else "")
+    chunks = [data[i:i + KITTY_CHUNK] for i in range(0, len(data), KITTY_CHUNK)] or [""]
+    out = []
+    for i, chunk in enumerate(chunks):
+        more = 1 if i < len(chunks) - 1 else 0
+        control = f"a=T,f=100,q=2{size},m={more}" if i == 0 else f"m={more}"
+        out.append(f"\x1b_G{control};{chunk}\x1b\\")
+    return "".join(out)
+
+
+def cell_size(stream=None) -> tuple:
+    """终端单元格的像素尺寸 (宽, 高)，取不到时返回 DEFAULT_CELL_SIZE"""
+    stream = stream or sys.stdout
+    try:
+        import fcntl
+        import struct
+        import termios
+
+        packed = fcntl.ioctl(stream.fileno(), termios.TIOCGWINSZ, b"\0" * 8)
+        rows, cols, xpixel, ypixel = struct.unpack("HHHH", packed)
+        if rows and cols and xpixel and ypixel:
+            return xpixel // cols, ypixel // rows
+    except (ImportError, OSError, ValueError):
+        pass
+    return DEFAULT_CELL_SIZE
+
+
+def detect_graphics(timeout: float = 0.2) -> str:
+    """检测终端支持的图形协议：'kitty' / 'sixel' / None
+
+    先看环境变量，再向终端发送 kitty 图形查询与主设备属性 (DA1) 查询：
+    kitty 应答 OK 即支持 kitty；DA1 属性含 4 即支持 Sixel。
+    非终端或非 POSIX 平台直接返回 None。
+    """
+    if not (sys.stdin.isatty() and sys.stdout.isatty()):
+        return None
+    term = os.environ.get("TERM", "")
+    if "kitty" in term or os.environ.get("KITTY_WINDOW_ID") \
+            or os.environ.get("TERM_PROGRAM") in ("WezTerm", "ghostty"):
+        return "kitty"
+
+    response = _query_terminal("\x1b_Gi=31,s=1,v=1,a=q,t=d,f=24;AAAA\x1b\\\x1b[c", timeout)
+    if "_Gi=31;OK" in response:
+        return "kitty"
+    start = response.find("\x1b[?")
+    if start >= 0:
+        attrs = response[start + 3:].split("c", 1)[0].split(";")
+        if "4" in attrs:
+            return "sixel"
+    return None
+
+
+def _query_terminal(query: str, timeout: float) -> str:
+    """以原始模式发送查询并读取应答，直到 DA1 应答结束（'c'）或超时"""
+    try:
+        import select
+        import termios
+        import tty
+    except ImportError:
+        return ""
+
+    fd = sys.stdin.fileno()
+    try:
+        saved = termios.tcgetattr(fd)
+    except termios.error:
+        return ""
+    response = ""
+    try:
+        tty.setcbreak(fd, termios.TCSANOW)
+        sys.stdout.write(query)
+        sys.stdout.flush()
+        while select.select([fd], [], [], timeout)[0]:
+            response += os.read(fd, 1024).decode("latin-1")
+            da1 = response.find("\x1b[?")
+            if da1 >= 0 and "c" in response[da1:]:
+                break
+    finally:
+        termios.tcsetattr(fd, termios.TCSAFLUSH, saved)
+    return response
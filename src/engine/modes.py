@@ -1,8 +1,12 @@
 """渲染模式实现 - 各种渲染策略"""
 
+import numpy as np
 from PIL import Image
 
 from . import ansi
+from .dither import dither_chars, quantize
+from .glyphs import (BLOCK_CHARS, BLOCK_GRIDS, BRAILLE_GRID, SHAPE_GRID,
+                     match_shapes, pack_braille)
 from .preprocess import brightness, mosaic, edge_detect, to_grayscale
 
 
@@ -74,19 +78,23 @@ def render_half_hd(img: Image.Image, glyph: str = "▀", delay: float = 0,
 def render_char_luminance(img: Image.Image, charset: str = " .:-=+*#%@",
                           color_strategy: str = "truecolor_fg",
                           invert: bool = False, delay: float = 0,
-                          return_lines: bool = False):
+                          return_lines: bool = False, dither: str = "none"):
     """亮度字符 - 前景色+字符"""
     import time
     pixels = img.load()
     w, h = img.size
     lines = []
+    dithered = dither_chars(img, charset, dither, invert) if dither != "none" else None
 
     for y in range(h):
         line = ""
         for x in range(w):
             r, g, b = pixels[x, y]
             br = brightness(r, g, b)
-            char = char_from_brightness(br, charset, invert)
+            if dithered:
+                char = dithered[y][x]
+            else:
+                char = char_from_brightness(br, charset, invert)
             if color_strategy == "truecolor_fg":
                 line += ansi.fg(r, g, b) + char
             elif color_strategy == "grayscale":
@@ -104,22 +112,57 @@ def render_char_luminance(img: Image.Image, charset: str = " .:-=+*#%@",
     return lines if return_lines else None
 
 
-def render_gray_level(img: Image.Image, charset: str = "░▒▓█",
+def render_char_shape(img: Image.Image, charset: str = " .:-=+*#%@",
+                      color_strategy: str = "truecolor_fg",
                       invert: bool = False, delay: float = 0,
                       return_lines: bool = False):
+    """形状字符 - 按单元格明暗分布匹配字形，img 为 prepare_image 输出的子像素图"""
+    import time
+    chars = match_shapes(img, charset, invert)
+    rows, cols = len(chars), len(chars[0]) if chars else 0
+    colors = img.resize((cols, rows), Image.Resampling.BOX).load() if chars else None
+    lines = []
+
+    for y in range(rows):
+        line = ""
+        for x in range(cols):
+            r, g, b = colors[x, y]
+            if color_strategy == "truecolor_fg":
+                line += ansi.fg(r, g, b) + chars[y][x]
+            elif color_strategy == "grayscale":
+                line += ansi.fg_gray(int(brightness(r, g, b) * 255)) + chars[y][x]
+            else:
+                line += chars[y][x]
+        line += ansi.reset()
+        lines.append(line)
+        if not return_lines:
+            print(line, flush=True)
+            if delay > 0:
+                time.sleep(delay / 1000)
+
+    return lines if return_lines else None
+
+
+def render_gray_level(img: Image.Image, charset: str = "░▒▓█",
+                      invert: bool = False, delay: float = 0,
+                      return_lines: bool = False, dither: str = "none"):
     """灰度映射 - 灰度色+灰度字符"""
     import time
     img = to_grayscale(img)
     pixels = img.load()
     w, h = img.size
     lines = []
+    dithered = dither_chars(img, charset, dither, invert) if dither != "none" else None
 
     for y in range(h):
         line = ""
         for x in range(w):
             r, g, b = pixels[x, y]
             br = brightness(r, g, b)
-            char = char_from_brightness(br, charset, invert)
+            if dithered:
+                char = dithered[y][x]
+            else:
+                char = char_from_brightness(br, charset, invert)
             gray = int(br * 255)
             line += ansi.fg_gray(gray) + char
         line += ansi.reset()
@@ -163,112 +206,257 @@ def render_edge_structure(img: Image.Image, charset: str = "/\\|_-",
     return lines if return_lines else None
 
 
+def render_quadrant(img: Image.Image, delay: float = 0, return_lines: bool = False):
+    """象限块 - 每个单元格 2×2 子像素，取最优双色分割"""
+    return _render_fg_bg(img, "quadrant", delay, return_lines)
+
+
+def render_sextant(img: Image.Image, delay: float = 0, return_lines: bool = False):
+    """六分块 - 每个单元格 2×3 子像素，取最优双色分割"""
+    return _render_fg_bg(img, "sextant", delay, return_lines)
+
+
+def _render_fg_bg(img: Image.Image, mode: str, delay: float, return_lines: bool):
+    """按前景 + 背景色逐单元格输出，img 为 prepare_image 输出的子像素图"""
+    import time
+    lines = []
+
+    for row in render_cells(img, mode):
+        line = "".join(ansi.fg(r, g, b) + ansi.bg(bg_r, bg_g, bg_b) + char
+                       for char, r, g, b, bg_r, bg_g, bg_b in row)
+        line += ansi.reset()
+        lines.append(line)
+        if not return_lines:
+            print(line, flush=True)
+            if delay > 0:
+                time.sleep(delay / 1000)
+
+    return lines if return_lines else None
+
+
+def render_braille(img: Image.Image, color_strategy: str = "truecolor_fg",
+                   invert: bool = False, delay: float = 0,
+                   return_lines: bool = False, dither: str = "none"):
+    """盲文点阵 - 每个单元格 2×4 个点，img 为 prepare_image 输出的点阵图"""
+    import time
+    lines = []
+
+    for row in render_cells(img, "braille", invert=invert, dither=dither):
+        line = ""
+        for char, r, g, b, *_ in row:
+            if color_strategy == "truecolor_fg":
+                line += ansi.fg(r, g, b) + char
+            elif color_strategy == "grayscale":
+                line += ansi.fg_gray(int(brightness(r, g, b) * 255)) + char
+            else:
+                line += char
+        line += ansi.reset()
+        lines.append(line)
+        if not return_lines:
+            print(line, flush=True)
+            if delay > 0:
+                time.sleep(delay / 1000)
+
+    return lines if return_lines else None
+
+
 # 模式注册表
 MODE_REGISTRY = {
     "pixel_raw": render_pixel_raw,
     "pixel_mosaic": render_pixel_mosaic,
     "half_hd": render_half_hd,
     "char_luminance": render_char_luminance,
+    "char_shape": render_char_shape,
     "gray_level": render_gray_level,
     "edge_structure": render_edge_structure,
+    "braille": render_braille,
+    "quadrant": render_quadrant,
+    "sextant": render_sextant,
 }
 
+# 输出单元格背景色的模式（前景 / 背景两种颜色各表示一部分子像素）
+BACKGROUND_MODES = ("half_hd", "quadrant", "sextant")
+
 
 # ============ HTML 渲染（供 Web 使用）============
 
 def render_to_html_data(img: Image.Image, mode: str, glyph: str = "█",
-                        charset: str = "", invert: bool = False):
-    """渲染图片为 HTML 行和字符数据"""
-    pixels = img.load()
-    w, h = img.size
-    html_lines = []
-    char_data = []
+                        charset: str = "", invert: bool = False, dither: str = "none"):
+    """渲染图片为 HTML 行和字符数据，dither 仅对 gray_level / 亮度字符生效"""
+    char_data = render_cells(img, mode, glyph, charset, invert, dither)
+    return cells_to_html(char_data, background=(mode in BACKGROUND_MODES)), char_data
+
+
+def render_cells(img: Image.Image, mode: str, glyph: str = "█",
+                 charset: str = "", invert: bool = False, dither: str = "none") -> list:
+    """渲染图片为字符数据（每个单元格为 (字符, r, g, b, bg_r, bg_g, bg_b)），不生成 HTML"""
+    img = preprocess_for_mode(img, mode)
+    return map_cells(img, color_planes(img, mode), mode, glyph, charset, invert, dither)
+
+
+def preprocess_for_mode(img: Image.Image, mode: str) -> Image.Image:
+    """模式预处理：马赛克 / 灰度 / 边缘检测，其它模式原样返回"""
+    if mode == "pixel_mosaic":
+        return mosaic(img, 2)
+    if mode == "gray_level":
+        return to_grayscale(img)
+    if mode == "edge_structure":
+        return edge_detect(img)
+    return img
+
+
+def color_planes(img: Image.Image, mode: str) -> tuple:
+    """颜色与亮度平面 (rgb uint8 (h, w, 3), 亮度 float64 (h, w))
+
+    形状匹配模式的颜色取每个单元格子像素的 BOX 平均，平面尺寸为单元格网格。
+    亮度公式与 brightness() 相同，逐元素计算结果一致。
+    """
+    if mode == "char_shape":
+        gw, gh = SHAPE_GRID
+        img = img.resize((img.width // gw, img.height // gh), Image.Resampling.BOX)
+    rgb = np.asarray(img.convert("RGB"))
+    lum = (0.2126 * rgb[..., 0] + 0.7152 * rgb[..., 1] + 0.0722 * rgb[..., 2]) / 255.0
+    rgb.setflags(write=False)
+    lum.setflags(write=False)
+    return rgb, lum
+
+
+def map_cells(img: Image.Image, planes: tuple, mode: str, glyph: str = "█",
+              charset: str = "", invert: bool = False, dither: str = "none") -> list:
+    """字形映射：由预处理后的图像与颜色平面生成字符数据
+
+    只依赖字形 / 字符集 / 反转 / 抖动参数，切换字符样式时前面的阶段可直接复用。
+    """
+    rgb, lum = planes
+    h, w = lum.shape
 
     if mode == "half_hd":
         half_glyph = glyph if glyph in ("▀", "▄") else "▀"
-        for y in range(0, h - 1, 2):
-            line = ""
-            row_data = []
-            for x in range(w):
-                r1, g1, b1 = pixels[x, y]
-                r2, g2, b2 = pixels[x, min(y + 1, h - 1)]
-                if half_glyph == "▀":
-                    line += f'<span style="color:rgb({r1},{g1},{b1});background:rgb({r2},{g2},{b2})">▀</span>'
-                    row_data.append(("▀", r1, g1, b1, r2, g2, b2))
-                else:
-                    line += f'<span style="color:rgb({r2},{g2},{b2});background:rgb({r1},{g1},{b1})">▄</span>'
-                    row_data.append(("▄", r2, g2, b2, r1, g1, b1))
-            html_lines.append(line)
-            char_data.append(row_data)
-
-    elif mode == "edge_structure":
-        img = edge_detect(img)
-        pixels = img.load()
-        for y in range(h):
-            line = ""
-            row_data = []
-            for x in range(w):
-                r, g, b = pixels[x, y]
-                br = brightness(r, g, b)
-                if invert:
-                    br = 1.0 - br
-                if br > 0.1 and charset:
-                    idx = min(int(br * len(charset)), len(charset) - 1)
-                    char = charset[idx]
-                else:
-                    char = " "
-                esc_char = _escape_html_char(char)
-                line += f'<span style="color:rgb({r},{g},{b})">{esc_char}</span>'
-                row_data.append((char, r, g, b, 30, 30, 30))
-            html_lines.append(line)
-            char_data.append(row_data)
+        rows = len(range(0, h - 1, 2))
+        top, bottom = rgb[0:rows * 2:2], rgb[1:rows * 2:2]
+        if half_glyph == "▄":
+            top, bottom = bottom, top
+        return _zip_cells([[half_glyph] * w] * rows, top, bottom)
+
+    if mode == "braille":
+        # 亮度过阈值（或抖动后为 1）的位置点亮；单元格颜色取点亮像素的平均色
+        gw, gh = BRAILLE_GRID
+        rows, cols = h // gh, w // gw
+        if dither == "none":
+            dots = (1.0 - lum if invert else lum) >= 0.5
+        else:
+            dots = quantize(lum, 2, dither, invert)
+        lit = dots[:rows * gh, :cols * gw].reshape(rows, gh, cols, gw, 1).astype(np.intp)
+        cells = rgb[:rows * gh, :cols * gw].reshape(rows, gh, cols, gw, 3).astype(np.intp)
+        count = lit.sum(axis=(1, 3))
+        colors = np.where(count > 0, (cells * lit).sum(axis=(1, 3)) // np.maximum(count, 1),
+                          cells.sum(axis=(1, 3)) // (gw * gh))
+        return _zip_cells(pack_braille(dots), colors)
+
+    if mode in BLOCK_GRIDS:
+        masks, fg, bg = fit_two_colors(rgb, BLOCK_GRIDS[mode])
+        return _zip_cells(np.array(list(BLOCK_CHARS[mode]))[masks].tolist(), fg, bg)
+
+    if mode == "edge_structure":
+        if charset:
+            br = 1.0 - lum if invert else lum
+            n = len(charset)
+            idx = np.minimum((br * n).astype(np.intp), n - 1)
+            chars = np.where(br > 0.1, np.array(list(charset))[idx], " ").tolist()
+        else:
+            chars = [[" "] * w] * h
+        colors = rgb
 
     elif mode == "gray_level":
-        img = to_grayscale(img)
-        pixels = img.load()
-        for y in range(h):
-            line = ""
-            row_data = []
-            for x in range(w):
-                r, g, b = pixels[x, y]
-                br = brightness(r, g, b)
-                char = char_from_brightness(br, charset, invert) if charset else " "
-                gray = int(br * 255)
-                esc_char = _escape_html_char(char)
-                line += f'<span style="color:rgb({gray},{gray},{gray})">{esc_char}</span>'
-                row_data.append((char, gray, gray, gray, 30, 30, 30))
-            html_lines.append(line)
-            char_data.append(row_data)
+        if charset:
+            chars = np.array(list(charset))[quantize(lum, len(charset), dither, invert)].tolist()
+        else:
+            chars = [[" "] * w] * h
+        gray = (lum * 255).astype(np.intp)
+        colors = np.stack([gray, gray, gray], axis=-1)
+
+    elif mode == "char_shape" and charset:
+        chars = match_shapes(img, charset, invert)
+        colors = rgb
 
     elif charset:
-        for y in range(h):
-            line = ""
-            row_data = []
-            for x in range(w):
-                r, g, b = pixels[x, y]
-                br = brightness(r, g, b)
-                char = char_from_brightness(br, charset, invert)
-                esc_char = _escape_html_char(char)
-                line += f'<span style="color:rgb({r},{g},{b})">{esc_char}</span>'
-                row_data.append((char, r, g, b, 30, 30, 30))
-            html_lines.append(line)
-            char_data.append(row_data)
+        chars = np.array(list(charset))[quantize(lum, len(charset), dither, invert)].tolist()
+        colors = rgb
+
+    else:
+        chars = [[glyph] * w] * h
+        colors = rgb
+
+    return _zip_cells(chars, colors)
+
+
+FIT_CHUNK = 16384  # 双色分割每批处理的单元格数，限制 (单元格 × 分割方式) 中间数组的内存
+
+
+def fit_two_colors(rgb: np.ndarray, grid: tuple) -> tuple:
+    """每个单元格子像素的最优双色分割 (掩码, 前景色, 背景色)
+
+    穷举所有分割方式（最后一个子像素固定属于背景，去掉对称重复），两组各取
+    平均色时平方误差 = 常数 - |S1|²/n1 - |S0|²/n0（S 为组内颜色和），因此只需
+    一次 (单元格, 3, 子像素) · (子像素, 分割数) 的矩阵乘法即可给所有单元格的
+    所有分割打分。均匀单元格固定取掩码 0（空白 + 背景色）。
+    """
+    gw, gh = grid
+    k = gw * gh
+    h, w = rgb.shape[:2]
+    rows, cols = h // gh, w // gw
+    cells = (rgb[:rows * gh, :cols * gw].reshape(rows, gh, cols, gw, 3)
+             .transpose(0, 2, 1, 3, 4).reshape(-1, k, 3).astype(np.float32))
+
+    patterns = _partitions(k)
+    n1 = patterns.sum(axis=1)
+    inv1 = np.divide(1.0, n1, out=np.zeros_like(n1), where=n1 > 0)
+    inv0 = 1.0 / (k - n1)
+    # 与掩码 0 打平的分割视为均匀单元格，避免浮点误差选出无意义的字形
+    penalty = np.where(n1 > 0, 1.0, 0.0).astype(np.float32)
+
+    best = np.empty(len(cells), dtype=np.intp)
+    for start in range(0, len(cells), FIT_CHUNK):
+        chunk = cells[start:start + FIT_CHUNK]
+        s1 = chunk.transpose(0, 2, 1) @ patterns.T
+        s0 = chunk.sum(axis=1)[:, :, None] - s1
+        score = (s1 * s1).sum(axis=1) * inv1 + (s0 * s0).sum(axis=1) * inv0 - penalty
+        best[start:start + FIT_CHUNK] = score.argmax(axis=1)
+
+    chosen = patterns[best][:, :, None]
+    count = chosen.sum(axis=1)
+    bg = (cells * (1 - chosen)).sum(axis=1) / (k - count)
+    fg = np.where(count > 0, (cells * chosen).sum(axis=1) / np.maximum(count, 1), bg)
+    return (best.reshape(rows, cols),
+            np.rint(fg).astype(np.intp).reshape(rows, cols, 3),
+            np.rint(bg).astype(np.intp).reshape(rows, cols, 3))
+
+
+def _partitions(k: int) -> np.ndarray:
+    """k 个子像素的全部双色分割 (2^(k-1), k)，第 m 行是掩码 m 的各位"""
+    masks = np.arange(1 << (k - 1))
+    return ((masks[:, None] >> np.arange(k)) & 1).astype(np.float32)
+
+
+def _zip_cells(chars: list, fg: np.ndarray, bg: np.ndarray = None) -> list:
+    """按行把字符与前景/背景色平面组装为单元格元组，bg 缺省为默认背景 (30, 30, 30)"""
+    fg_planes = [fg[..., i].tolist() for i in range(3)]
+    if bg is None:
+        h, w = fg.shape[:2]
+        bg_planes = [[[30] * w] * h] * 3
+    else:
+        bg_planes = [bg[..., i].tolist() for i in range(3)]
+    return [list(zip(*row)) for row in zip(chars, *fg_planes, *bg_planes)]
+
 
+def cells_to_html(char_data: list, background: bool = False) -> list:
+    """字符数据转为 HTML 行，background 为 True 时同时输出单元格背景色"""
+    if background:
+        template = '<span style="color:rgb({1},{2},{3});background:rgb({4},{5},{6})">{0}</span>'
     else:
-        if mode == "pixel_mosaic":
-            img = mosaic(img, 2)
-            pixels = img.load()
-        for y in range(h):
-            line = ""
-            row_data = []
-            for x in range(w):
-                r, g, b = pixels[x, y]
-                line += f'<span style="color:rgb({r},{g},{b})">{glyph}</span>'
-                row_data.append((glyph, r, g, b, 30, 30, 30))
-            html_lines.append(line)
-            char_data.append(row_data)
-
-    return html_lines, char_data
+        template = '<span style="color:rgb({1},{2},{3})">{0}</span>'
+    return ["".join(template.format(_escape_html_char(cell[0]), *cell[1:])
+                    for cell in row) for row in char_data]
 
 
 def _escape_html_char(char: str) -> str:
@@ -0,0 +1,210 @@
+"""分阶段渲染管线 - 每个阶段按自身依赖的参数缓存
+
+    缩放准备 → 模式预处理 → 颜色/亮度平面 → 字形映射 → HTML 序列化
+
+每个阶段的缓存键只包含它真正依赖的参数：切换字符样式或反转只会重新执行
+字形映射与序列化，缩放、边缘检测、马赛克等前置结果直接复用。
+
+缓存未命中时按键合并并发计算（single-flight）：多个请求同时渲染同一图片、
+同一参数时只计算一次，其余请求等待并共享结果。
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+from .modes import BACKGROUND_MODES, preprocess_for_mode, color_planes, map_cells, cells_to_html
+
+# 各阶段缓存容量：图像阶段按条目数，字符数据阶段按单元格总数
+MAX_CACHED_IMAGES = 8
+MAX_CACHED_CELLS = 500_000
+
+
+def fingerprint(img: Image.Image) -> str:
+    """图像内容指纹（尺寸 + 模式 + 像素数据的 SHA-256 摘要）
+
+    SHA-256 在支持硬件指令的 CPU 上比 BLAKE2b 快一倍以上，大图的主要开销在 tobytes。
+    """
+    digest = hashlib.sha256(f"{img.mode}:{img.size}:".encode("ascii"))
+    digest.update(img.tobytes())
+    return digest.hexdigest()[:32]
+
+
+class RenderCancelled(Exception):
+    """渲染在阶段之间被调用方取消（推测性预渲染让位于真实请求）"""
+
+
+class _Flight:
+    """一次进行中的计算，等待者阻塞到计算完成后取得同一结果（或同一异常）"""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._value = None
+        self._error = None
+
+    def finish(self, value=None, error: BaseException = None):
+        self._value, self._error = value, error
+        self._done.set()
+
+    def wait(self):
+        self._done.wait()
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+
+class StageCache:
+    """线程安全的 LRU 缓存，按条目权重之和限制容量，并发的相同未命中只计算一次
+
+    hits 为命中缓存次数，misses 为实际计算次数，coalesced 为等待进行中的
+    相同计算而省下的计算次数。
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._items = OrderedDict()
+        self._total = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute, weight=None):
+        """命中则返回缓存值，否则调用 compute() 计算并缓存；weight(value) 给出条目权重
+
+        同一键已有计算在进行时不重复计算，等待其完成后返回相同结果。
+        """
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key][0]
+            flight = self._inflight.get(key)
+            if flight is None:
+                flight = self._inflight[key] = _Flight()
+                self.misses += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            return flight.wait()
+
+        try:
+            value = compute()
+            cost = weight(value) if weight else 1
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            flight.finish(error=e)
+            raise
+
+        with self._lock:
+            del self._inflight[key]
+            if cost <= self.capacity and key not in self._items:
+                self._items[key] = (value, cost)
+                self._total += cost
+                while self._total > self.capacity:
+                    _, (_, evicted) = self._items.popitem(last=False)
+                    self._total -= evicted
+        flight.finish(value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._total = 0
+
+
+def _cell_count(char_data: list) -> int:
+    return len(char_data) * (len(char_data[0]) if char_data else 0)
+
+
+def _geometry(mode: str) -> str:
+    """缩放阶段的网格：形状匹配子像素、盲文点阵、双色分块、半块双倍行、普通单元格"""
+    if mode == "char_shape":
+        return "shape"
+    if mode in ("braille", "quadrant", "sextant"):
+        return mode
+    if mode == "half_hd":
+        return "half"
+    return "cell"
+
+
+def _preprocess_kind(mode: str) -> str:
+    """模式预处理阶段的种类，不做预处理的模式共用同一结果"""
+    return mode if mode in ("pixel_mosaic", "gray_level", "edge_structure") else "none"
+
+
+class RenderPipeline:
+    """带逐阶段缓存的渲染管线（供 Web 预览 / 导出复用）"""
+
+    def __init__(self, renderer):
+        self.renderer = renderer
+        self.prepared = StageCache(MAX_CACHED_IMAGES)
+        self.preprocessed = StageCache(MAX_CACHED_IMAGES)
+        self.planes = StageCache(MAX_CACHED_IMAGES)
+        self.mapped = StageCache(MAX_CACHED_CELLS)
+        self.serialized = StageCache(MAX_CACHED_CELLS)
+
+    def render(self, img: Image.Image, template: dict, glyph_variant: dict, width: int,
+               serialize: bool = True, image_key: str = None, cancel=None,
+               cached: bool = True) -> tuple:
+        """渲染为 (HTML 行, 字符数据)，serialize 为 False 时 HTML 行为 None
+
+        image_key 为调用方已算好的图像键（指纹，或能唯一确定图像的其它摘要），缺省时按内容计算。
+        cached 为 False 时各阶段直接计算、不读写缓存，也不计算指纹（一次性输入，
+        对大图做指纹需要复制全部像素）。
+        cancel 为可选回调，每个阶段开始前调用，返回真时抛出 RenderCancelled。
+        返回的字符数据与 HTML 行可能被缓存共享，调用方不应修改。
+        """
+        def stage(cache: StageCache, key, compute, weight=None):
+            if cancel is not None and cancel():
+                raise RenderCancelled()
+            if not cached:
+                return compute()
+            return cache.get_or_compute(key, compute, weight)
+
+        mode = template.get("mode", "pixel_raw")
+        defaults = template.get("defaults", {})
+        aspect = defaults.get("aspect", 0.5)
+        invert = defaults.get("invert", False)
+        dither = template.get("dither", "none")
+        glyph = glyph_variant.get("glyph", "█") if glyph_variant else "█"
+        charset = glyph_variant.get("charset", "") if glyph_variant else ""
+
+        if cached and not image_key:
+            image_key = fingerprint(img)
+        prepared_key = (image_key, width, aspect, _geometry(mode))
+        prepared = stage(self.prepared, prepared_key,
+                         lambda: self.renderer.prepare_image(img, width, aspect, mode))
+
+        pre_key = prepared_key + (_preprocess_kind(mode),)
+        pre = stage(self.preprocessed, pre_key, lambda: preprocess_for_mode(prepared, mode))
+
+        # 形状匹配模式的颜色平面按单元格网格取平均，与其它模式分开缓存
+        planes_key = pre_key + (mode == "char_shape",)
+        planes = stage(self.planes, planes_key, lambda: color_planes(pre, mode))
+
+        mapped_key = planes_key + (mode, glyph, charset, invert, dither)
+        char_data = stage(self.mapped, mapped_key,
+                          lambda: map_cells(pre, planes, mode, glyph, charset, invert, dither),
+                          weight=_cell_count)
+
+        if not serialize:
+            return None, char_data
+        html_lines = stage(self.serialized, mapped_key,
+                           lambda: cells_to_html(char_data, background=(mode in BACKGROUND_MODES)),
+                           weight=lambda _: _cell_count(char_data))
+        return html_lines, char_data
+
+    def stats(self) -> dict:
+        """各阶段缓存命中、实际计算与合并等待的次数"""
+        return {name: {"hits": cache.hits, "misses": cache.misses, "coalesced": cache.coalesced}
+                for name, cache in (("prepared", self.prepared), ("preprocessed", self.preprocessed),
+                                    ("planes", self.planes), ("mapped", self.mapped),
+                                    ("serialized", self.serialized))}
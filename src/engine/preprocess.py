@@ -20,6 +20,14 @@ def resize(img: Image.Image, width: int, aspect: float) -> Image.Image:
     return img.resize((width, height), Image.Resampling.LANCZOS)
 
 
+def resize_cells(img: Image.Image, width: int, aspect: float,
+                 cell_w: int, cell_h: int) -> Image.Image:
+    """按单元格缩放：行数与 resize 相同，每个单元格保留 cell_w×cell_h 个子像素"""
+    ratio = img.height / img.width
+    rows = max(1, int(width * ratio * aspect))
+    return img.resize((width * cell_w, rows * cell_h), Image.Resampling.LANCZOS)
+
+
 def center_crop(img: Image.Image, target_w: int, target_h: int) -> Image.Image:
     """中心裁剪"""
     w, h = img.size
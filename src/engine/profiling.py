@@ -0,0 +1,121 @@
+"""像素画生成器 - 按需性能分析
+
+capture 在当前线程上同时运行 cProfile 与栈采样，结束后写出两个文件：
+
+    <时间>-<名称>-<PID>-<序号>.pstats   cProfile 统计（python -m pstats / snakeviz 查看）
+    <时间>-<名称>-<PID>-<序号>.folded   折叠栈文本，每行 "帧;帧;... 采样数"
+                                       （flamegraph.pl / speedscope 直接生成火焰图）
+
+栈采样由后台线程每 SAMPLE_INTERVAL 秒读取一次被分析线程的调用栈，与 cProfile
+同时运行时函数调用密集的代码占比会略为偏高。ProfileSwitch 供 Web 服务按请求数开启。
+"""
+
+import cProfile
+import itertools
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+PROFILE_DIR = "data/profiles"
+SAMPLE_INTERVAL = 0.005  # 栈采样间隔（秒）
+MAX_RECENT_PROFILES = 20
+
+_seq = itertools.count(1)
+
+
+class _StackSampler(threading.Thread):
+    """定时采样指定线程的调用栈，按折叠栈计数"""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        super().__init__(name="pixel-profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+@contextmanager
+def capture(name: str, directory: str = PROFILE_DIR):
+    """分析 with 块内当前线程的执行，退出时写出 .pstats 与 .folded
+
+    产生一个 dict，退出后其 "pstats" / "folded" 为写出的文件路径。
+    """
+    result = {}
+    sampler = _StackSampler(threading.get_ident())
+    profile = cProfile.Profile()
+    sampler.start()
+    profile.enable()
+    try:
+        yield result
+    finally:
+        profile.disable()
+        sampler.stop()
+        os.makedirs(directory, exist_ok=True)
+        stem = os.path.join(directory, "{}-{}-{}-{}".format(
+            time.strftime("%Y%m%d-%H%M%S"), re.sub(r"[^\w.-]+", "_", name), os.getpid(), next(_seq)))
+        result["pstats"] = stem + ".pstats"
+        result["folded"] = stem + ".folded"
+        profile.dump_stats(result["pstats"])
+        with open(result["folded"], "w", encoding="utf-8") as f:
+            for stack, count in sampler.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class ProfileSwitch:
+    """线程安全的"接下来 N 次请求"分析开关"""
+
+    def __init__(self, directory: str = PROFILE_DIR):
+        self.directory = directory
+        self.remaining = 0
+        self.recent = []
+        self._lock = threading.Lock()
+
+    def arm(self, count: int):
+        """分析接下来的 count 次请求（覆盖尚未用完的次数，0 为关闭）"""
+        with self._lock:
+            self.remaining = max(0, count)
+
+    def take(self) -> bool:
+        """本次请求是否需要分析（需要时消耗一次）"""
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+    @contextmanager
+    def capture(self, name: str):
+        """同 capture，写入本开关的目录并记录最近的输出文件"""
+        with capture(name, self.directory) as result:
+            yield result
+        with self._lock:
+            self.recent = (self.recent + [result])[-MAX_RECENT_PROFILES:]
+        print(f"[INFO] 性能分析已保存: {result['pstats']}")
+
+    def maybe(self, name: str):
+        """开关开启时分析，否则什么都不做（上下文管理器）"""
+        return self.capture(name) if self.take() else nullcontext()
+
+    def status(self) -> dict:
+        with self._lock:
+            return {"remaining": self.remaining, "directory": self.directory,
+                    "recent": list(self.recent)}
@@ -1,14 +1,21 @@
 """渲染引擎 - 图片加载、配置管理、渲染调度"""
 
 import json
+import os
 import shutil
+import sys
+from collections import OrderedDict
 from pathlib import Path
 
 from PIL import Image
 
-from . import ansi
-from .modes import MODE_REGISTRY
-from .preprocess import resize, center_crop
+from . import ansi, graphics
+from .buffers import image_from_buffer, open_raw
+from .modes import MODE_REGISTRY, preprocess_for_mode
+from .glyphs import BLOCK_GRIDS, BRAILLE_GRID, SHAPE_GRID
+from .preprocess import resize, resize_cells, center_crop
+
+PREPARED_PER_IMAGE = 8  # 每张缓存图片保留的缩放结果数
 
 
 class Config:
@@ -62,12 +69,50 @@ class Config:
 class Renderer:
     """渲染引擎"""
 
-    def __init__(self, config: Config = None):
+    def __init__(self, config: Config = None, image_cache: int = 0):
         self.config = config or Config()
+        # 常驻进程按 (路径, 修改时间, 大小) 缓存最近解码的图片，0 为不缓存；
+        # 缓存中的图片同时保留最近的 prepare_image 结果（按对象 id，随图片一起淘汰）
+        self.image_cache = image_cache
+        self._images = OrderedDict()
+        self._prepared = {}
 
     def load_image(self, path: str) -> Image.Image:
-        """加载图片"""
-        return Image.open(path).convert("RGB")
+        """加载图片，已是 RGB 的图片不再额外复制"""
+        if self.image_cache:
+            stat = os.stat(path)
+            key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+            if key in self._images:
+                self._images.move_to_end(key)
+                return self._images[key]
+
+        img = Image.open(path)
+        if img.mode == "RGB":
+            img.load()
+        else:
+            img = img.convert("RGB")
+
+        if self.image_cache:
+            self._images[key] = img
+            self._prepared[id(img)] = OrderedDict()
+            while len(self._images) > self.image_cache:
+                _, evicted = self._images.popitem(last=False)
+                self._prepared.pop(id(evicted), None)
+        return img
+
+    def load_buffer(self, buf, size: tuple = None, channels: int = None,
+                    stride: int = 0) -> Image.Image:
+        """从 NumPy 数组 / memoryview / bytes 加载图片，尽量零拷贝
+
+        返回的图像可能是 L / RGBA 模式并引用原缓冲区，prepare_image 会在
+        缩放后再转换为 RGB。
+        """
+        return image_from_buffer(buf, size, channels, stride)
+
+    def load_raw(self, path: str, size: tuple, channels: int = 3, offset: int = 0,
+                 stride: int = 0) -> Image.Image:
+        """以内存映射方式加载原始 RGB/RGBA 帧文件"""
+        return open_raw(path, size, channels, offset, stride)
 
     def get_terminal_width(self) -> int:
         """获取终端宽度"""
@@ -78,10 +123,53 @@ class Renderer:
 
     def prepare_image(self, img: Image.Image, width: int, aspect: float,
                       mode: str = None) -> Image.Image:
-        """准备图片 - 缩放"""
-        if mode == "half_hd":
-            aspect = aspect * 2
-        return resize(img, width, aspect)
+        """准备图片 - 缩放，形状匹配模式每个单元格保留 4×8 子像素，盲文模式保留 2×4 个点，
+        象限 / 六分块模式保留 2×2 / 2×3 个子像素
+
+        非 RGB 输入（如缓冲区来的 RGBA / L）先缩放再转换，只转换小图。
+        """
+        memo = self._prepared.get(id(img))
+        if memo is not None:
+            key = (width, aspect, mode)
+            if key not in memo:
+                memo[key] = self._prepare_image(img, width, aspect, mode)
+                while len(memo) > PREPARED_PER_IMAGE:
+                    memo.popitem(last=False)
+            memo.move_to_end(key)
+            return memo[key]
+        return self._prepare_image(img, width, aspect, mode)
+
+    @staticmethod
+    def _prepare_image(img: Image.Image, width: int, aspect: float, mode: str = None) -> Image.Image:
+        if mode == "char_shape":
+            img = resize_cells(img, width, aspect, *SHAPE_GRID)
+        elif mode == "braille":
+            img = resize_cells(img, width, aspect, *BRAILLE_GRID)
+        elif mode in BLOCK_GRIDS:
+            img = resize_cells(img, width, aspect, *BLOCK_GRIDS[mode])
+        else:
+            if mode == "half_hd":
+                aspect = aspect * 2
+            img = resize(img, width, aspect)
+        return img if img.mode == "RGB" else img.convert("RGB")
+
+    @staticmethod
+    def cell_grid(mode: str = None) -> tuple:
+        """prepare_image 为每个单元格保留的子像素网格 (横, 纵)"""
+        if mode == "char_shape":
+            return SHAPE_GRID
+        if mode == "braille":
+            return BRAILLE_GRID
+        if mode in BLOCK_GRIDS:
+            return BLOCK_GRIDS[mode]
+        return (1, 2) if mode == "half_hd" else (1, 1)
+
+    @staticmethod
+    def source_width(width: int, aspect: float, mode: str = None) -> int:
+        """prepare_image 以 width 列渲染时有意义的源图宽度上限：宽于该值的源图只会被缩小，
+        不再带来细节。纵向子像素较密的模式（如形状匹配）按 aspect 折算到横向"""
+        cell_w, cell_h = Renderer.cell_grid(mode)
+        return round(width * max(cell_w, cell_h * aspect))
 
     def prepare_preview(self, img: Image.Image, preview_width: int = 40,
                         preview_height: int = 12, mode: str = None) -> Image.Image:
@@ -96,6 +184,7 @@ class Renderer:
         """执行渲染"""
         mode = template.get("mode", "pixel_raw")
         color_strategy = template.get("color_strategy", "truecolor")
+        dither = template.get("dither", "none")
 
         if clear and not return_lines:
             ansi.clear_screen()
@@ -116,10 +205,48 @@ class Renderer:
         elif mode == "half_hd":
             return render_func(img, glyph=glyph, delay=delay, return_lines=return_lines)
         elif mode == "char_luminance":
+            return render_func(img, charset=charset, color_strategy=color_strategy,
+                               invert=invert, delay=delay, return_lines=return_lines,
+                               dither=dither)
+        elif mode == "char_shape":
             return render_func(img, charset=charset, color_strategy=color_strategy,
                                invert=invert, delay=delay, return_lines=return_lines)
-        elif mode in ("gray_level", "edge_structure"):
+        elif mode == "gray_level":
+            return render_func(img, charset=charset, invert=invert, delay=delay,
+                               return_lines=return_lines, dither=dither)
+        elif mode == "edge_structure":
             return render_func(img, charset=charset, invert=invert, delay=delay,
                                return_lines=return_lines)
+        elif mode in ("quadrant", "sextant"):
+            return render_func(img, delay=delay, return_lines=return_lines)
+        elif mode == "braille":
+            return render_func(img, color_strategy=color_strategy, invert=invert, delay=delay,
+                               return_lines=return_lines, dither=dither)
         else:
             return render_func(img, delay=delay, return_lines=return_lines)
+
+    def render_graphics(self, img: Image.Image, template: dict, width: int, aspect: float,
+                        protocol: str, clear: bool = False) -> tuple:
+        """以终端图形协议（sixel / kitty）输出像素图，返回采样尺寸
+
+        采样网格与半块模式相同（每个单元格 1×2 像素），按模板做马赛克 / 灰度 / 边缘
+        预处理，占用的终端区域与字符模式一致：Sixel 按单元格像素尺寸最近邻放大后编码，
+        kitty 直接发送采样图，由终端按 c= / r= 指定的单元格数缩放。
+        """
+        mode = template.get("mode", "pixel_raw")
+        sample = preprocess_for_mode(self.prepare_image(img, width, aspect, "half_hd"), mode)
+        cols, rows = sample.width, (sample.height + 1) // 2
+
+        if protocol == "sixel":
+            cell_w, cell_h = graphics.cell_size()
+            data = graphics.encode_sixel(sample, scale=(cell_w, max(1, cell_h // 2)))
+        elif protocol == "kitty":
+            data = graphics.encode_kitty(sample, cols, rows)
+        else:
+            raise ValueError(f"未知图形协议: {protocol}")
+
+        if clear:
+            ansi.clear_screen()
+        sys.stdout.write(data + "\n")
+        sys.stdout.flush()
+        return sample.size
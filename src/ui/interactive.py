@@ -1,8 +1,8 @@
 """交互式界面 - 模板选择、glyph选择、预览、确认、导出"""
 
 from src.engine.renderer import Renderer, Config
-from src.engine.exporter import export_png, export_html, export_ansi, export_char_png
-from src.engine.modes import render_to_html_data
+from src.engine.exporter import export_png, export_html, export_ansi, export_char_png, export_svg
+from src.engine.modes import render_cells
 from .preview import render_preview
 from .save_dialog import choose_save_path
 
@@ -96,6 +96,7 @@ def prompt_export(full_img, render_lines: list, char_data: list, template_id: st
     print("  2) 导出字符画图像 (PNG)")
     print("  3) 导出 HTML (可浏览器查看)")
     print("  4) 导出 ANSI 文本 (终端回放)")
+    print("  5) 导出 SVG 矢量图 (可无损缩放打印)")
     print("  0) 不导出")
 
     choice = input("选择: ").strip()
@@ -132,6 +133,14 @@ def prompt_export(full_img, render_lines: list, char_data: list, template_id: st
             else:
                 print("[ERR] ANSI 导出失败")
 
+    elif choice == "5":
+        path = choose_save_path("svg", f"pixel_art_{template_id}")
+        if path:
+            if export_svg(char_data, path, title=f"Pixel Art - {template_id}"):
+                print(f"[OK] SVG 已保存: {path}")
+            else:
+                print("[ERR] SVG 导出失败")
+
 
 def interactive_session(renderer: Renderer, config: Config, default_image: str):
     """交互式会话"""
@@ -193,7 +202,8 @@ def interactive_session(renderer: Renderer, config: Config, default_image: str):
 
             glyph = glyph_variant.get("glyph", "█") if glyph_variant else "█"
             charset = glyph_variant.get("charset", "") if glyph_variant else ""
-            _, char_data = render_to_html_data(full_img, mode, glyph, charset, invert)
+            dither = template.get("dither", "none")
+            char_data = render_cells(full_img, mode, glyph, charset, invert, dither)
 
             glyph_id = glyph_variant.get("id", "default") if glyph_variant else "N/A"
             print(f"\n[完成] 模板={template['id']}, 样式={glyph_id}, 尺寸={full_img.size[0]}x{full_img.size[1]}")
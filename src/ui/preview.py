@@ -3,6 +3,7 @@
 from PIL import Image
 
 from src.engine.preprocess import center_crop, resize, brightness
+from src.engine.modes import BACKGROUND_MODES, render_cells
 from src.engine import ansi
 
 
@@ -38,6 +39,16 @@ def render_preview(img: Image.Image, template: dict, glyph_variant: dict,
                 else:
                     line += ansi.fg(r2, g2, b2) + ansi.bg(r1, g1, b1) + "▄"
             print(line + ansi.reset(), flush=True)
+    elif mode in ("braille", "quadrant", "sextant"):
+        sub_img = renderer.prepare_image(cropped, preview_w, 0.5, mode)
+        for row in render_cells(sub_img, mode, invert=template.get("defaults", {}).get("invert", False),
+                                dither=template.get("dither", "none")):
+            if mode in BACKGROUND_MODES:
+                line = "".join(ansi.fg(r1, g1, b1) + ansi.bg(r2, g2, b2) + char
+                               for char, r1, g1, b1, r2, g2, b2 in row)
+            else:
+                line = "".join(ansi.fg(r, g, b) + char for char, r, g, b, *_ in row)
+            print(line + ansi.reset(), flush=True)
     elif charset:
         for y in range(h):
             line = ""
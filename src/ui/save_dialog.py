@@ -13,6 +13,7 @@ def choose_save_path(ext: str, default_name: str = "output") -> str:
     filetypes = {
         "png": ("PNG 图片", "*.png"),
         "html": ("HTML 文件", "*.html"),
+        "svg": ("SVG 矢量图", "*.svg"),
         "ans": ("ANSI 文本", "*.ans"),
         "txt": ("文本文件", "*.txt"),
     }
@@ -1 +1,2 @@
 from .app import create_app
+from .api import create_api_router
@@ -0,0 +1,211 @@
+"""像素画生成器 - 无界面 HTTP API（与 Gradio 共用同一 FastAPI 服务）
+
+POST /v1/render
+    multipart/form-data: images（可多个文件）、preset、glyph、width、format
+    application/json:    {"images": [base64...], "preset", "glyph", "width", "format"}
+
+format 取值: png / html / ansi / cells / svg。结果以 NDJSON 流式返回，每完成一张
+图片输出一行，顺序为完成顺序，用 index 对应请求中的图片位置。
+
+POST /v1/jobs
+    参数同 /v1/render，任务写入队列由工作进程执行（需配置 PIXEL_QUEUE），立即返回任务 ID
+GET /v1/jobs/{id}  任务状态；完成后 result 与 /v1/render 每行的结果格式相同
+GET /v1/tiles/{token}/{ty}/{tx}  分块预览的单个分块 HTML（由预览页面按需请求）
+GET /v1/ready    就绪探针，预热完成前返回 503
+GET /v1/stats    渲染管线各阶段的缓存命中 / 实际计算 / 合并等待次数，当前负载等级、推测性预渲染与内存预算统计
+GET /v1/presets  可用预设与字符样式
+POST /v1/admin/profile  {"requests": N} 分析接下来 N 次预览 / 导出 / API 渲染（0 为关闭）
+GET /v1/admin/profile   分析开关状态与最近写出的 .pstats / .folded 文件
+    管理接口需配置 admin_token，请求头 X-Admin-Token 须与之一致
+"""
+
+import base64
+import hmac
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from .app import PixelArtApp, ARTIFACT_FORMATS
+from .jobs import JobQueue
+
+MAX_BATCH = 32
+
+
+def encode_artifact(result: dict) -> dict:
+    """将渲染产物转换为可 JSON 序列化的结构"""
+    data = result["data"]
+    if result["format"] == "png":
+        data = base64.b64encode(data).decode("ascii")
+    elif result["format"] == "cells":
+        data = {
+            "glyphs": data["glyphs"],
+            "fg": base64.b64encode(data["fg"]).decode("ascii"),
+            "bg": base64.b64encode(data["bg"]).decode("ascii"),
+        }
+    return {"format": result["format"], "cols": result["cols"], "rows": result["rows"], "data": data}
+
+
+def _encode_result(index: int, name: str, result: dict) -> dict:
+    """NDJSON 流中的一行结果"""
+    return {"index": index, "name": name, "ok": True, **encode_artifact(result)}
+
+
+async def _parse_request(request: Request) -> tuple:
+    """解析 multipart 或 JSON 请求，返回 (图片列表[(name, bytes)], 参数 dict)"""
+    content_type = request.headers.get("content-type", "")
+    images = []
+
+    if content_type.startswith("application/json"):
+        try:
+            body = await request.json()
+            for i, item in enumerate(body.get("images", [])):
+                images.append((f"image_{i}", base64.b64decode(item)))
+        except Exception:
+            raise HTTPException(status_code=400, detail="无效的 JSON 请求体或图片编码")
+        params = body
+    else:
+        form = await request.form()
+        for item in form.getlist("images"):
+            if hasattr(item, "read"):
+                images.append((item.filename or f"image_{len(images)}", await item.read()))
+        params = dict(form)
+
+    if not images:
+        raise HTTPException(status_code=400, detail="缺少图片")
+    if len(images) > MAX_BATCH:
+        raise HTTPException(status_code=400, detail=f"单次最多 {MAX_BATCH} 张图片")
+
+    fmt = params.get("format") or "png"
+    if fmt not in ARTIFACT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"未知格式: {fmt}")
+    try:
+        width = int(params["width"]) if params.get("width") else None
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="width 必须是整数")
+
+    return images, {
+        "template_id": params.get("preset") or "",
+        "glyph_id": params.get("glyph") or None,
+        "width": width,
+        "fmt": fmt,
+    }
+
+
+def create_api_router(app: PixelArtApp, max_workers: int = 2,
+                      jobs: JobQueue = None, admin_token: str = None) -> APIRouter:
+    """创建 HTTP API 路由，渲染任务在独立的有界线程池中执行
+
+    传入 jobs 时启用 /v1/jobs：任务写入队列，由 `main.py worker` 进程执行。
+    传入 admin_token 时启用 /v1/admin 管理接口。
+    """
+    router = APIRouter(prefix="/v1")
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pixel-api")
+
+    def render_one(data: bytes, params: dict) -> dict:
+        return app.render_encoded(data, **params)
+
+    @router.post("/render")
+    async def render(request: Request):
+        images, params = await _parse_request(request)
+        if not app.config.get_template(params["template_id"]):
+            raise HTTPException(status_code=400, detail=f"未知预设: {params['template_id']}")
+
+        def stream():
+            futures = {executor.submit(render_one, data, params): (i, name)
+                       for i, (name, data) in enumerate(images)}
+            try:
+                for future in as_completed(futures):
+                    index, name = futures[future]
+                    try:
+                        item = _encode_result(index, name, future.result())
+                    except Exception as e:
+                        item = {"index": index, "name": name, "ok": False, "error": str(e)}
+                    yield json.dumps(item, ensure_ascii=False) + "\n"
+            finally:
+                # 客户端断开时取消尚未开始的任务
+                for future in futures:
+                    future.cancel()
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    if jobs is not None:
+        @router.post("/jobs", status_code=202)
+        async def submit_jobs(request: Request):
+            """写入渲染任务（图片原样入队，不在前端解码），返回任务 ID"""
+            images, params = await _parse_request(request)
+            if not app.config.get_template(params["template_id"]):
+                raise HTTPException(status_code=400, detail=f"未知预设: {params['template_id']}")
+
+            def enqueue_all() -> list:
+                return [{"index": i, "name": name, "id": jobs.enqueue(data, params)}
+                        for i, (name, data) in enumerate(images)]
+            # SQLite 写入可能等待数据库锁（最长 30 秒），放到线程池执行，不阻塞事件循环
+            return {"jobs": await run_in_threadpool(enqueue_all)}
+
+        @router.get("/jobs/{job_id}")
+        def job_status(job_id: str):
+            """任务状态：queued / leased / done / failed，完成后包含 result"""
+            job = jobs.get(job_id)
+            if job is None:
+                raise HTTPException(status_code=404, detail="任务不存在或已过期")
+            return job
+
+    if admin_token:
+        def check_admin(token: str):
+            if not token or not hmac.compare_digest(token, admin_token):
+                raise HTTPException(status_code=403, detail="管理口令无效")
+
+        @router.post("/admin/profile")
+        async def arm_profile(request: Request, x_admin_token: str = Header(None)):
+            """开启性能分析：接下来的 requests 次渲染写出 .pstats 与 .folded"""
+            check_admin(x_admin_token)
+            try:
+                count = int((await request.json()).get("requests", 1))
+            except Exception:
+                raise HTTPException(status_code=400, detail="请求体应为 {\"requests\": N}")
+            app.profiler.arm(count)
+            return app.profiler.status()
+
+        @router.get("/admin/profile")
+        def profile_status(x_admin_token: str = Header(None)):
+            check_admin(x_admin_token)
+            return app.profiler.status()
+
+    @router.get("/tiles/{token}/{ty}/{tx}")
+    def tile(token: str, ty: int, tx: int):
+        """分块预览：返回一个分块的 HTML，预览被替换或淘汰后返回 404"""
+        tiled = app.tiles.get(token)
+        if tiled is None:
+            raise HTTPException(status_code=404, detail="预览已过期，请重新生成")
+        try:
+            html = tiled.tile(ty, tx)
+        except IndexError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        return HTMLResponse(html, headers={"Cache-Control": "private, max-age=600"})
+
+    @router.get("/ready")
+    def ready():
+        """就绪探针：预热完成前返回 503"""
+        is_ready = app.ready.is_set()
+        return JSONResponse({"ready": is_ready}, status_code=200 if is_ready else 503)
+
+    @router.get("/stats")
+    def stats():
+        """渲染统计：coalesced 为并发相同请求合并后省下的计算次数，saved 为各阶段之和"""
+        stages = app.pipeline.stats()
+        return {"stages": stages,
+                "saved": sum(stage["coalesced"] for stage in stages.values()),
+                "load": app.load.stats(),
+                "speculative": app.speculator.stats(),
+                "memory": app.memory.stats()}
+
+    @router.get("/presets")
+    def presets():
+        return [{"id": t["id"], "name": t["name"], "mode": t.get("mode", "pixel_raw"),
+                 "glyphs": [v for _, v in app.get_glyph_choices(t["id"])]}
+                for t in app.config.templates]
+
+    return router
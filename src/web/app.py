@@ -1,31 +1,115 @@
 """像素画生成器 - Gradio Web 应用核心"""
 
+import hashlib
+import io
+import os
 import tempfile
+import threading
 import time
+from collections import OrderedDict
+from functools import partial
 from pathlib import Path
-from PIL import Image
+from PIL import Image, ImageOps
 
 import gradio as gr
 
 from src.engine.renderer import Config, Renderer
-from src.engine.preprocess import resize
-from src.engine.modes import render_to_html_data
-from src.engine.exporter import export_char_png
+from src.engine.modes import BACKGROUND_MODES, cells_to_html
+from src.engine.pipeline import RenderCancelled, RenderPipeline
+from src.engine.exporter import CHUNK_CSS, HTML_CHUNK_ROWS, chunk_html_rows, export_char_png, export_svg, render_svg
+from src.engine.glyphs import FONT_SIZE, SHAPE_GRID, load_font, match_shapes
+from src.engine.profiling import PROFILE_DIR, ProfileSwitch
+
+from .images import ImageStore, StoredImage
+from .load import LoadMonitor
+from .memory import (MEMORY_BUDGET, MemoryBudget, MemoryBudgetExceeded, decoded_bytes, draft_to_width,
+                     image_header, render_bytes)
+from .speculate import Speculator
+from .tiles import TileStore
 
 # 常量
-MAX_WIDTH = 300
-PREVIEW_WIDTH = 180
+MIN_WIDTH = 60
+MAX_WIDTH = 800
+WIDTH_STEP = 10         # 精细度滑块步长，推测性预渲染按该步长预测下一次宽度
+PREVIEW_WIDTH = 180      # 超过该宽度的预览改为分块懒加载
+MAX_IMAGE_SIZE = 6000   # 上传图片的最长边上限
+ARTIFACT_FORMATS = ("png", "html", "ansi", "cells", "svg")
+COARSE_RATIO = 3        # 渐进式预览：粗略版宽度为完整预览的 1/3
+MIN_COARSE_WIDTH = 20   # 粗略版低于该宽度时直接输出完整预览
+MAX_LIVE_SESSIONS = 1000
+DEGRADED_WIDTHS = {1: 120, 2: 60}  # 各负载等级下的预览宽度上限
+# 过载时预览暂停的高开销模式（子像素网格 / 边缘检测），以像素映射代替
+EXPENSIVE_PREVIEW_MODES = ("char_shape", "edge_structure", "braille", "quadrant", "sextant")
+FALLBACK_PREVIEW_TEMPLATE = "PIXEL_RAW"
+
+EMPTY_PREVIEW = """<div class="preview-box empty">
+                <div class="empty-hint">
+                    <span class="icon">🖼️</span>
+                    <p>上传图片开始创作</p>
+                </div>
+            </div>"""
 
 
 class PixelArtApp:
     """像素画生成器应用"""
     
-    def __init__(self, config_path: Path = None):
+    def __init__(self, config_path: Path = None, memory_budget: int = MEMORY_BUDGET,
+                 profile_dir: str = PROFILE_DIR):
         if config_path is None:
             config_path = Path(__file__).parent.parent.parent / "config" / "presets.json"
         self.config = Config(config_path)
         self.renderer = Renderer(self.config)
+        # 分阶段缓存的渲染管线：切换字符样式时只重做字形映射与序列化
+        self.pipeline = RenderPipeline(self.renderer)
+        # 实时预览：每个会话最新请求的序号，旧序号的渲染直接跳过
+        self._live_seq = OrderedDict()
+        self._live_lock = threading.Lock()
+        # 预热完成后置位，供就绪探针使用
+        self.ready = threading.Event()
+        # 大尺寸分块预览的会话缓存
+        self.tiles = TileStore()
+        # 上传图片的服务端句柄
+        self.images = ImageStore()
+        # 负载监测：繁忙时预览临时降级，导出保持完整质量
+        self.load = LoadMonitor()
+        # 空闲时预渲染"下一步"预览（宽度 ±1 档、相邻字符样式）
+        self.speculator = Speculator(self.load.idle)
+        # 渲染内存预算：按估算峰值准入，并发数不再需要按最坏情况压低
+        self.memory = MemoryBudget(memory_budget)
+        # 按需性能分析：管理接口开启后分析接下来的若干次预览 / 导出 / API 渲染
+        self.profiler = ProfileSwitch(profile_dir)
     
+    def warmup(self):
+        """预热：加载字体和 PIL 编解码插件，预计算各模板的字形特征，
+        并对每个模板执行一次极小渲染，消除首个请求的冷启动延迟"""
+        start = time.time()
+        try:
+            Image.init()
+            load_font(FONT_SIZE)
+            load_font(FONT_SIZE * 2)
+
+            sample = Image.linear_gradient("L").resize((64, 48)).convert("RGB")
+            char_data = []
+            for template in self.config.templates:
+                family = self.config.get_glyph_family(template.get("glyph_family", ""))
+                variants = family.get("variants", []) or [{}]
+                if template.get("mode") == "char_shape":
+                    for variant in variants:
+                        if variant.get("charset"):
+                            match_shapes(sample.resize(SHAPE_GRID), variant["charset"])
+                html_lines, char_data = self.render_to_html_lines(sample, template, variants[0], 16)
+                self.renderer.render(self.renderer.prepare_image(sample, 16, 0.5, template.get("mode")),
+                                     template, variants[0], return_lines=True)
+
+            if char_data:
+                export_char_png(char_data, io.BytesIO())
+            sample.save(io.BytesIO(), "JPEG")
+            print(f"[OK] 预热完成 ({time.time() - start:.2f}s)")
+        except Exception as e:
+            print(f"[WARN] 预热失败，按冷启动继续: {e}")
+        finally:
+            self.ready.set()
+
     def get_template_choices(self):
         """获取模板下拉选项"""
         return [(f"{t['name']} - {t['desc']}", t['id']) for t in self.config.templates]
@@ -63,32 +147,169 @@ class PixelArtApp:
         return choices
 
     @staticmethod
-    def limit_image_size(img: Image.Image, max_size: int = 6000) -> Image.Image:
-        """限制图片尺寸"""
-        w, h = img.size
+    def limited_size(size: tuple, max_size: int = MAX_IMAGE_SIZE) -> tuple:
+        """limit_image_size 处理后的尺寸"""
+        w, h = size
         if max(w, h) > max_size:
             ratio = max_size / max(w, h)
-            new_w, new_h = int(w * ratio), int(h * ratio)
-            resized = img.resize((new_w, new_h), Image.Resampling.LANCZOS)
-            return resized
+            return int(w * ratio), int(h * ratio)
+        return size
+
+    @classmethod
+    def limit_image_size(cls, img: Image.Image, max_size: int = MAX_IMAGE_SIZE) -> Image.Image:
+        """限制图片尺寸"""
+        size = cls.limited_size(img.size, max_size)
+        if size != img.size:
+            return img.resize(size, Image.Resampling.LANCZOS)
         return img
 
+    def source_width_limit(self) -> int:
+        """各模板以 MAX_WIDTH 列渲染时用到的最大源图宽度，浏览器上传前据此预缩放"""
+        return max((self.renderer.source_width(MAX_WIDTH, t.get("defaults", {}).get("aspect", 0.5),
+                                               t.get("mode", "pixel_raw"))
+                    for t in self.config.templates), default=MAX_IMAGE_SIZE)
+
+    def resolve_image(self, image) -> StoredImage:
+        """处理函数的图片参数：上传句柄或 PIL 图片，句柄已失效时返回 None"""
+        if isinstance(image, str):
+            return self.images.get(image)
+        return StoredImage("", self.limit_image_size(image))
+
+    def render_char_data(self, img: Image.Image, template: dict,
+                         glyph_variant: dict, width: int, image_key: str = None) -> list:
+        """渲染图片为字符数据（不生成 HTML）"""
+        return self.pipeline.render(img, template, glyph_variant, width,
+                                    serialize=False, image_key=image_key)[1]
+
     def render_to_html_lines(self, img: Image.Image, template: dict, 
-                             glyph_variant: dict, width: int) -> tuple:
+                             glyph_variant: dict, width: int, image_key: str = None) -> tuple:
         """渲染图片为 HTML 行"""
-        mode = template.get("mode", "pixel_raw")
-        aspect = template.get("defaults", {}).get("aspect", 0.5)
+        return self.pipeline.render(img, template, glyph_variant, width, image_key=image_key)
+
+    @staticmethod
+    def has_cell_background(template: dict) -> bool:
+        """该模板的单元格是否带背景色（半块 / 双色分块模式用背景色表示部分子像素）"""
+        return template.get("mode", "pixel_raw") in BACKGROUND_MODES
 
-        if mode == "half_hd":
-            aspect = aspect * 2
+    def resolve_glyph_variant(self, template: dict, glyph_id: str) -> dict:
+        """按模板和 glyph ID 获取字符样式，"default" 或空值取默认样式"""
+        family_id = template.get("glyph_family", "")
+        if not glyph_id or glyph_id == "default":
+            return self.config.get_glyph_variant(family_id)
+        return self.config.get_glyph_variant(family_id, glyph_id)
 
-        img = resize(img, width, aspect)
+    @staticmethod
+    def build_html_page(html_lines: list, template_id: str, chunk_rows: int = HTML_CHUNK_ROWS) -> str:
+        """将 HTML 行包装为完整的网页，按行块拆分，浏览器只布局可见部分"""
+        content = chunk_html_rows(html_lines, chunk_rows)
+        return f"""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <title>Pixel Art - {template_id}</title>
+    <style>
+        body {{ background-color: #1a1a2e; margin: 20px; }}
+        pre {{ font-family: Consolas, Monaco, 'Courier New', monospace; font-size: 12px; line-height: 1.0; }}
+        {CHUNK_CSS}
+    </style>
+</head>
+<body>
+{content}
+</body>
+</html>"""
 
-        glyph = glyph_variant.get("glyph", "█") if glyph_variant else "█"
-        charset = glyph_variant.get("charset", "") if glyph_variant else ""
-        invert = template.get("defaults", {}).get("invert", False)
+    def render_artifact(self, img: Image.Image, template_id: str, glyph_id: str = None,
+                        width: int = None, fmt: str = "png") -> dict:
+        """渲染单张图片为指定格式的产物（供 HTTP API 使用）
+
+        返回 dict: format/cols/rows 以及 data（png 为 bytes，html/ansi/svg 为 str，
+        cells 为紧凑的字符网格）。参数无效时抛出 ValueError，超出内存预算时抛出
+        MemoryBudgetExceeded。
+        """
+        template, glyph_variant, width = self._artifact_params(template_id, glyph_id, width, fmt)
+        img = self.limit_image_size(img)
+        with self.memory.reserve(render_bytes(img.size, template, width, fmt)), \
+                self.load.track(record=False), self.profiler.maybe(f"api-{template['id']}-{fmt}"):
+            # 调用方直接传入的图片没有现成的键，不为一次性渲染计算像素指纹，跳过管线缓存
+            return self._render_artifact(img, template, glyph_variant, width, fmt)
+
+    def render_encoded(self, data: bytes, template_id: str, glyph_id: str = None,
+                       width: int = None, fmt: str = "png") -> dict:
+        """同 render_artifact，输入为未解码的图片数据
+
+        先只读图片头，按尺寸估算解码与渲染的内存峰值，登记预算后才解码；
+        JPEG 在解码阶段直接缩小到该渲染实际用到的源图宽度。管线缓存键取编码数据的
+        摘要加解码尺寸，不对解码后的像素做指纹。
+        """
+        template, glyph_variant, width = self._artifact_params(template_id, glyph_id, width, fmt)
+        aspect = template.get("defaults", {}).get("aspect", 0.5)
+        img = draft_to_width(image_header(data),
+                             self.renderer.source_width(width, aspect, template.get("mode")))
+        limited = self.limited_size(img.size)
+        # 解码（非 RGB 时含转换）+ 尺寸限制 + 渲染；管线缓存键不读取像素，没有指纹副本
+        estimate = decoded_bytes(img.size, img.mode) + render_bytes(limited, template, width, fmt)
+        if limited != img.size:
+            estimate += limited[0] * limited[1] * 3
+        with self.memory.reserve(estimate), self.load.track(record=False), \
+                self.profiler.maybe(f"api-{template['id']}-{fmt}"):
+            # 已是 RGB 时不再 convert：同模式 convert 会多复制一份原图，不在估算内
+            img.load()
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            img = self.limit_image_size(img)
+            image_key = f"{hashlib.sha256(data).hexdigest()[:32]}:{img.width}x{img.height}"
+            return self._render_artifact(img, template, glyph_variant, width, fmt, image_key)
 
-        return render_to_html_data(img, mode, glyph, charset, invert)
+    def _artifact_params(self, template_id: str, glyph_id: str, width: int, fmt: str) -> tuple:
+        """校验产物参数，返回 (模板, 字符样式, 宽度)；无效时抛出 ValueError"""
+        if fmt not in ARTIFACT_FORMATS:
+            raise ValueError(f"未知格式: {fmt}")
+        template = self.config.get_template(template_id)
+        if not template:
+            raise ValueError(f"未知预设: {template_id}")
+
+        glyph_variant = self.resolve_glyph_variant(template, glyph_id)
+        if not width:
+            width = template.get("defaults", {}).get("width", 150)
+        return template, glyph_variant, max(1, min(int(width), MAX_WIDTH))
+
+    def _render_artifact(self, img: Image.Image, template: dict, glyph_variant: dict,
+                         width: int, fmt: str, image_key: str = None) -> dict:
+        """render_artifact 的渲染部分（参数已校验）；没有 image_key 时不使用管线缓存"""
+        template_id = template["id"]
+        if fmt == "ansi":
+            defaults = template.get("defaults", {})
+            mode = template.get("mode", "pixel_raw")
+            full_img = self.renderer.prepare_image(img, width, defaults.get("aspect", 0.5), mode)
+            lines = self.renderer.render(full_img, template, glyph_variant,
+                                         invert=defaults.get("invert", False),
+                                         return_lines=True) or []
+            return {"format": fmt, "cols": full_img.size[0], "rows": len(lines),
+                    "data": "\n".join(lines)}
+
+        char_data = self.pipeline.render(img, template, glyph_variant, width, serialize=False,
+                                         image_key=image_key, cached=image_key is not None)[1]
+        rows = len(char_data)
+        cols = len(char_data[0]) if char_data else 0
+
+        if fmt == "html":
+            html_lines = cells_to_html(char_data, self.has_cell_background(template))
+            data = self.build_html_page(html_lines, template_id)
+        elif fmt == "svg":
+            data = render_svg(char_data, title=f"Pixel Art - {template_id}")
+        elif fmt == "cells":
+            data = {
+                "glyphs": ["".join(cell[0] for cell in row) for row in char_data],
+                "fg": bytes(v for row in char_data for cell in row for v in cell[1:4]),
+                "bg": bytes(v for row in char_data for cell in row for v in cell[4:7]),
+            }
+        else:
+            buf = io.BytesIO()
+            if not export_char_png(char_data, buf):
+                raise ValueError("PNG 导出失败")
+            data = buf.getvalue()
+
+        return {"format": fmt, "cols": cols, "rows": rows, "data": data}
 
     def on_template_change(self, template_id: str):
         """模板改变时更新 glyph 下拉"""
@@ -96,133 +317,322 @@ class PixelArtApp:
         default_value = choices[0][1] if choices else "default"
         return gr.Dropdown(choices=choices, value=default_value)
 
-    def do_preview(self, img, template_id: str, glyph_id: str, width: int):
-        """预览"""
-        if img is None:
-            return """<div class="preview-box empty">
-                <div class="empty-hint">
-                    <span class="icon">🖼️</span>
-                    <p>上传图片开始创作</p>
-                </div>
-            </div>"""
+    def do_preview(self, image, template_id: str, glyph_id: str, width: int,
+                   request: gr.Request = None):
+        """预览（生成器）- 先输出低分辨率粗略结果，再输出完整分辨率结果
+
+        image 为上传句柄（或 PIL 图片）。宽度超过 PREVIEW_WIDTH 时完整结果以
+        分块方式输出：字符数据只渲染一次并缓存在会话中，浏览器滚动到哪里再
+        请求哪里的分块。服务繁忙时按负载等级降级（见 _degraded_preview）。
+        """
+        if image is None:
+            yield EMPTY_PREVIEW
+            return
 
+        level = self.load.level()
         try:
-            img = self.limit_image_size(img)
+            stored = self.resolve_image(image)
+            if stored is None:
+                yield "<div class='preview-box error'>图片已失效，请重新上传</div>"
+                return
             template = self.config.get_template(template_id)
             if not template:
-                return "<div class='preview-box error'>无效的模板</div>"
-
-            family_id = template.get("glyph_family", "")
-            glyph_variant = self.config.get_glyph_variant(family_id, glyph_id) if glyph_id != "default" else self.config.get_glyph_variant(family_id)
-
-            preview_w = min(width, PREVIEW_WIDTH)
-            html_lines, _ = self.render_to_html_lines(img, template, glyph_variant, preview_w)
-            content = "\n".join(html_lines)
-            return f"""<div class="preview-box"><pre>{content}</pre></div>"""
+                yield "<div class='preview-box error'>无效的模板</div>"
+                return
+
+            glyph_variant = self.resolve_glyph_variant(template, glyph_id)
+            with self.load.track():
+                if level:
+                    yield self._degraded_preview(stored, template, glyph_variant, width, level)
+                else:
+                    with self._reserve(stored, template, min(width, MAX_WIDTH), "html"):
+                        frames = self._full_preview(stored, template, glyph_variant, width, request)
+                        if self.profiler.take():
+                            # 生成器的各步可能在不同线程执行，被分析的预览一次算完再输出
+                            with self.profiler.capture(f"preview-{template['id']}-{width}"):
+                                frames = list(frames)
+                        yield from frames
+            if not level:
+                session = request.session_hash if request is not None else ""
+                self._speculate(session, stored, template, glyph_variant, width)
 
         except Exception as e:
-            return f"<div class='preview-box error'>预览失败: {str(e)}</div>"
+            yield f"<div class='preview-box error'>预览失败: {str(e)}</div>"
+
+    def _full_preview(self, stored: StoredImage, template: dict, glyph_variant: dict,
+                      width: int, request: gr.Request = None):
+        """完整质量的渐进式预览"""
+        img = stored.image
+        preview_w = min(width, MAX_WIDTH)
+        coarse_w = min(preview_w, PREVIEW_WIDTH) // COARSE_RATIO
+        if coarse_w >= MIN_COARSE_WIDTH:
+            # 先从缩小的金字塔层级渲染，避免对原图做大尺寸重采样
+            factor = max(1, img.width // (coarse_w * 4))
+            html_lines, _ = self.render_to_html_lines(stored.reduce(factor), template, glyph_variant,
+                                                      coarse_w, image_key=f"{stored.key}/{factor}")
+            content = "\n".join(html_lines)
+            yield f"""<div class="preview-box coarse"><pre>{content}</pre></div>"""
+
+        if preview_w > PREVIEW_WIDTH:
+            char_data = self.render_char_data(img, template, glyph_variant, preview_w, stored.key)
+            session = request.session_hash if request is not None else ""
+            tiled = self.tiles.put(session, char_data, self.has_cell_background(template))
+            yield tiled.placeholder()
+            return
+
+        html_lines, _ = self.render_to_html_lines(img, template, glyph_variant, preview_w, stored.key)
+        content = "\n".join(html_lines)
+        yield f"""<div class="preview-box"><pre>{content}</pre></div>"""
+
+    def _reserve(self, stored: StoredImage, template: dict, width: int, fmt: str,
+                 timeout: float = None):
+        """为已解码的图片登记一次渲染的内存预算（上下文管理器）"""
+        return self.memory.reserve(render_bytes(stored.image.size, template, width, fmt), timeout)
+
+    def _speculate(self, session: str, stored: StoredImage, template: dict,
+                   glyph_variant: dict, width: int):
+        """登记该会话最可能的下一次预览：宽度 ±1 档，其次同宽度下相邻的字符样式"""
+        if not stored.key:
+            return
+        tasks = []
+        for w in (width + WIDTH_STEP, width - WIDTH_STEP):
+            if MIN_WIDTH <= w <= MAX_WIDTH:
+                tasks.append(partial(self._warm_preview, stored, template, glyph_variant, w))
+
+        family = self.config.get_glyph_family(template.get("glyph_family", ""))
+        variants = family.get("variants", []) if family else []
+        ids = [v["id"] for v in variants]
+        if glyph_variant and glyph_variant.get("id") in ids and len(ids) > 1:
+            i = ids.index(glyph_variant["id"])
+            for j in dict.fromkeys(((i + 1) % len(ids), (i - 1) % len(ids))):
+                if j != i:
+                    tasks.append(partial(self._warm_preview, stored, template, variants[j], width))
+        self.speculator.schedule(session, tasks)
+
+    def _warm_preview(self, stored: StoredImage, template: dict, glyph_variant: dict,
+                      width: int, cancel):
+        """按 _full_preview 的方式渲染进管线缓存（大宽度只需字符数据），不产生输出；
+        内存预算不足时不等待，直接放弃"""
+        try:
+            with self._reserve(stored, template, width, "html", timeout=0):
+                self.pipeline.render(stored.image, template, glyph_variant, width,
+                                     serialize=width <= PREVIEW_WIDTH, image_key=stored.key, cancel=cancel)
+        except MemoryBudgetExceeded:
+            raise RenderCancelled()
+
+    def _degraded_preview(self, stored: StoredImage, template: dict, glyph_variant: dict,
+                          width: int, level: int) -> str:
+        """降级预览：限制宽度、跳过粗略版，从缩小的金字塔层级重采样（代价远低于
+        对原图做 LANCZOS）；过载时高开销模式以像素映射代替。导出不受影响。"""
+        preview_w = min(width, MAX_WIDTH, DEGRADED_WIDTHS[level])
+        notes = [f"服务器繁忙，预览临时降为 {preview_w} 列"]
+        fallback = self.config.get_template(FALLBACK_PREVIEW_TEMPLATE)
+        if level >= 2 and fallback and template.get("mode") in EXPENSIVE_PREVIEW_MODES:
+            notes.append(f"「{template['name']}」预览暂以{fallback['name']}代替")
+            template = fallback
+            glyph_variant = self.resolve_glyph_variant(template, None)
+
+        factor = max(1, stored.image.width // (preview_w * 4))
+        html_lines, _ = self.render_to_html_lines(stored.reduce(factor), template, glyph_variant,
+                                                  preview_w, image_key=f"{stored.key}/{factor}")
+        content = "\n".join(html_lines)
+        notice = "，".join(notes) + "；导出仍为完整质量"
+        return (f'<div class="preview-box degraded"><div class="load-notice">{notice}</div>'
+                f'<pre>{content}</pre></div>')
+
+    def _next_live_seq(self, session: str) -> int:
+        """登记会话的一次新实时预览请求，返回其序号"""
+        with self._live_lock:
+            seq = self._live_seq.pop(session, 0) + 1
+            self._live_seq[session] = seq
+            while len(self._live_seq) > MAX_LIVE_SESSIONS:
+                self._live_seq.popitem(last=False)
+            return seq
+
+    def _is_live_stale(self, session: str, seq: int) -> bool:
+        """该会话是否已有更新的实时预览请求"""
+        with self._live_lock:
+            return self._live_seq.get(session) != seq
+
+    def do_live_preview(self, image, template_id: str, glyph_id: str, width: int,
+                        live: bool, request: gr.Request = None):
+        """实时预览（生成器）- 只渲染会话内最新的一组参数
+
+        防抖由前端完成（trigger_mode="always_last"：进行中时只保留最后一次触发），
+        服务端不再等待，以免空占工作线程与预览并发组的名额。
+        """
+        if not live or image is None:
+            yield gr.update()
+            return
+
+        session = request.session_hash if request is not None else ""
+        seq = self._next_live_seq(session)
+        # 粗略版与完整版之间检查一次，已有更新的请求则不再进行完整渲染
+        for html in self.do_preview(image, template_id, glyph_id, width, request):
+            yield html
+            if self._is_live_stale(session, seq):
+                return
+
+    def store_upload(self, session: str, path: str) -> StoredImage:
+        """解码上传的图片文件并保存到服务端
+
+        先只读图片头，按尺寸估算解码、旋正、限制尺寸与计算指纹的内存峰值，登记预算后
+        才解码；JPEG 在解码阶段直接缩小到最大精细度用到的源图宽度。超出预算时抛出
+        MemoryBudgetExceeded。
+        """
+        img = draft_to_width(image_header(path), self.source_width_limit())
+        limited = self.limited_size(img.size)
+        pixels = img.width * img.height
+        estimate = decoded_bytes(img.size, img.mode) + limited[0] * limited[1] * 3
+        if limited != img.size:
+            estimate += limited[0] * limited[1] * 3
+        transpose = img.getexif().get(0x0112, 1) != 1  # EXIF Orientation
+        if transpose:
+            estimate += pixels * 3
+        with self.memory.reserve(estimate):
+            img.load()
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            if transpose:
+                img = ImageOps.exif_transpose(img)
+            return self.images.put(session, self.limit_image_size(img))
+
+    def do_upload(self, path: str, handle: str = None, request: gr.Request = None):
+        """上传图片：解码与尺寸限制只做一次，图片保存在服务端，之后的事件只传句柄"""
+        if handle:
+            self.images.drop(handle)
+        new_handle = None
+        if path is not None:
+            session = request.session_hash if request is not None else ""
+            try:
+                new_handle = self.store_upload(session, path).handle
+            except MemoryBudgetExceeded as e:
+                gr.Warning(str(e))
+            except OSError as e:
+                gr.Warning(f"无法读取图片: {e}")
+        return (new_handle,) + self.auto_clear_on_upload()
 
     def auto_clear_on_upload(self):
         """上传新图片时自动清除旧的预览和下载"""
         return (
-            """<div class="preview-box empty">
-                <div class="empty-hint">
-                    <span class="icon">🖼️</span>
-                    <p>上传图片开始创作</p>
-                </div>
-            </div>""",  # 清空预览
+            EMPTY_PREVIEW,  # 清空预览
             None,  # 清空 PNG 下载
-            None   # 清空 HTML 下载
+            None,  # 清空 HTML 下载
+            None   # 清空 SVG 下载
         )
 
-    def do_clear(self):
+    def do_clear(self, handle: str = None):
         """清除缓存"""
+        if handle:
+            self.images.drop(handle)
         return (
             None,  # 清空图片
-            """<div class="preview-box empty">
-                <div class="empty-hint">
-                    <span class="icon">🖼️</span>
-                    <p>上传图片开始创作</p>
-                </div>
-            </div>""",  # 清空预览
+            None,  # 清空图片句柄
+            EMPTY_PREVIEW,  # 清空预览
             None,  # 清空 PNG 下载
-            None   # 清空 HTML 下载
+            None,  # 清空 HTML 下载
+            None   # 清空 SVG 下载
         )
 
-    def do_export_png(self, img, template_id: str, glyph_id: str, width: int):
+    @staticmethod
+    def export_path(template_id: str, suffix: str) -> str:
+        """导出文件路径：在临时目录中独占创建，并发导出同一模板不会互相覆盖或读到对方的文件"""
+        fd, path = tempfile.mkstemp(suffix=suffix, prefix=f"pixel_art_{template_id}_")
+        os.close(fd)
+        return path
+
+    def do_export_png(self, image, template_id: str, glyph_id: str, width: int):
         """导出字符画图像"""
-        if img is None:
+        if image is None:
             gr.Warning("请先上传图片")
             return None
 
         try:
-            img = self.limit_image_size(img)
+            stored = self.resolve_image(image)
+            if stored is None:
+                gr.Warning("图片已失效，请重新上传")
+                return None
             template = self.config.get_template(template_id)
             if not template:
                 gr.Warning("无效的模板")
                 return None
 
             width = min(width, MAX_WIDTH)
-            family_id = template.get("glyph_family", "")
-            glyph_variant = self.config.get_glyph_variant(family_id, glyph_id) if glyph_id != "default" else self.config.get_glyph_variant(family_id)
+            glyph_variant = self.resolve_glyph_variant(template, glyph_id)
+
+            filepath = self.export_path(template_id, ".png")
 
-            _, char_data = self.render_to_html_lines(img, template, glyph_variant, width)
+            with self._reserve(stored, template, width, "png"), self.load.track(record=False), \
+                    self.profiler.maybe(f"export-{template_id}-png"):
+                char_data = self.render_char_data(stored.image, template, glyph_variant, width, stored.key)
+                export_char_png(char_data, filepath)
+            return filepath
 
-            timestamp = int(time.time())
-            filename = f"pixel_art_{template_id}_{timestamp}.png"
-            filepath = Path(tempfile.gettempdir()) / filename
+        except Exception as e:
+            gr.Warning(f"导出失败: {str(e)}")
+            return None
+
+    def do_export_svg(self, image, template_id: str, glyph_id: str, width: int):
+        """导出 SVG 矢量图"""
+        if image is None:
+            gr.Warning("请先上传图片")
+            return None
+
+        try:
+            stored = self.resolve_image(image)
+            if stored is None:
+                gr.Warning("图片已失效，请重新上传")
+                return None
+            template = self.config.get_template(template_id)
+            if not template:
+                gr.Warning("无效的模板")
+                return None
+
+            width = min(width, MAX_WIDTH)
+            glyph_variant = self.resolve_glyph_variant(template, glyph_id)
 
-            export_char_png(char_data, str(filepath))
-            return str(filepath)
+            filepath = self.export_path(template_id, ".svg")
+
+            with self._reserve(stored, template, width, "svg"), self.load.track(record=False), \
+                    self.profiler.maybe(f"export-{template_id}-svg"):
+                char_data = self.render_char_data(stored.image, template, glyph_variant, width, stored.key)
+                export_svg(char_data, filepath, title=f"Pixel Art - {template_id}")
+            return filepath
 
         except Exception as e:
             gr.Warning(f"导出失败: {str(e)}")
             return None
 
-    def do_export_html(self, img, template_id: str, glyph_id: str, width: int):
+    def do_export_html(self, image, template_id: str, glyph_id: str, width: int):
         """导出 HTML"""
-        if img is None:
+        if image is None:
             gr.Warning("请先上传图片")
             return None
 
         try:
-            img = self.limit_image_size(img)
+            stored = self.resolve_image(image)
+            if stored is None:
+                gr.Warning("图片已失效，请重新上传")
+                return None
             template = self.config.get_template(template_id)
             if not template:
                 gr.Warning("无效的模板")
                 return None
 
             width = min(width, MAX_WIDTH)
-            family_id = template.get("glyph_family", "")
-            glyph_variant = self.config.get_glyph_variant(family_id, glyph_id) if glyph_id != "default" else self.config.get_glyph_variant(family_id)
+            glyph_variant = self.resolve_glyph_variant(template, glyph_id)
 
-            html_lines, _ = self.render_to_html_lines(img, template, glyph_variant, width)
-            content = "\n".join(html_lines)
-            
-            html_content = f"""<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>Pixel Art - {template_id}</title>
-    <style>
-        body {{ background-color: #1a1a2e; margin: 20px; }}
-        pre {{ font-family: Consolas, Monaco, 'Courier New', monospace; font-size: 12px; line-height: 1.0; }}
-    </style>
-</head>
-<body>
-<pre>{content}</pre>
-</body>
-</html>"""
+            with self._reserve(stored, template, width, "html"), self.load.track(record=False), \
+                    self.profiler.maybe(f"export-{template_id}-html"):
+                html_lines, _ = self.render_to_html_lines(stored.image, template, glyph_variant, width, stored.key)
+                html_content = self.build_html_page(html_lines, template_id)
 
-            timestamp = int(time.time())
-            filename = f"pixel_art_{template_id}_{timestamp}.html"
-            filepath = Path(tempfile.gettempdir()) / filename
+            filepath = self.export_path(template_id, ".html")
 
             with open(filepath, "w", encoding="utf-8") as f:
                 f.write(html_content)
 
-            return str(filepath)
+            return filepath
 
         except Exception as e:
             gr.Warning(f"导出失败: {str(e)}")
@@ -294,6 +704,22 @@ def get_css():
     margin: 0;
     white-space: pre;
 }
+.preview-box.coarse pre { font-size: 24px; }
+.preview-box.tiled { display: block; }
+.preview-box.degraded { flex-direction: column; }
+.load-notice {
+    color: #ffd166;
+    font-size: 12px;
+    margin-bottom: 8px;
+}
+.tile-grid {
+    position: relative;
+    margin: 0 auto;
+    font-family: Consolas, Monaco, 'Courier New', monospace;
+    font-size: 8px;
+    line-height: 1.0;
+}
+.tile-grid pre { position: absolute; }
 .preview-box.empty { background: linear-gradient(135deg, #1a1a2e 0%, #16213e 100%); }
 .empty-hint { text-align: center; color: #666; }
 .empty-hint .icon { font-size: 48px; display: block; margin-bottom: 12px; opacity: 0.5; }
@@ -320,15 +746,153 @@ def get_css():
     .main-row > div:first-child { max-width: 100% !important; }
     .preview-box { height: 260px; }
     .preview-box pre { font-size: 4px; }
+    .preview-box.coarse pre { font-size: 12px; }
+    .tile-grid { font-size: 4px; }
 }
 """
 
 
-def create_app(config_path: Path = None) -> gr.Blocks:
-    """创建 Gradio 应用"""
-    app = PixelArtApp(config_path)
+def get_head(source_width: int = MAX_IMAGE_SIZE, max_size: int = MAX_IMAGE_SIZE):
+    """页面头部脚本：分块预览的懒加载器与上传前的图片预缩放
+
+    为每个 .tile-grid 按分块数生成绝对定位的 <pre> 占位，IntersectionObserver
+    在分块进入（或接近）预览框可视区域时请求 /v1/tiles，离开后清空以控制 DOM 规模。
+
+    选择或拖入 #source-image 的图片宽于 source_width（最大精细度渲染用到的源图宽度）
+    或最长边超过 max_size 时，先在浏览器中用 canvas 缩小并重新编码再交给上传组件，
+    省去手机大图的上传流量与服务端解码。解码失败或重新编码后反而更大时上传原文件。
+    """
+    return """<script>
+(function () {
+    const base = () => (window.gradio_config && window.gradio_config.root) || "";
+
+    function setup(grid) {
+        grid.dataset.ready = "1";
+        const d = grid.dataset;
+        const rows = +d.rows, cols = +d.cols, th = +d.tileRows, tw = +d.tileCols;
+        const observer = new IntersectionObserver((entries) => {
+            for (const entry of entries) {
+                const pre = entry.target;
+                if (entry.isIntersecting && !pre.dataset.state) {
+                    pre.dataset.state = "loading";
+                    fetch(`${base()}/v1/tiles/${d.token}/${pre.dataset.ty}/${pre.dataset.tx}`)
+                        .then((r) => (r.ok ? r.text() : ""))
+                        .then((html) => {
+                            if (pre.dataset.state === "loading") {
+                                pre.innerHTML = html;
+                                pre.dataset.state = "loaded";
+                            }
+                        })
+                        .catch(() => delete pre.dataset.state);
+                } else if (!entry.isIntersecting && pre.dataset.state) {
+                    pre.innerHTML = "";
+                    delete pre.dataset.state;
+                }
+            }
+        }, { root: grid.closest(".preview-box"), rootMargin: "50%%" });
+
+        for (let ty = 0; ty * th < rows; ty++) {
+            for (let tx = 0; tx * tw < cols; tx++) {
+                const pre = document.createElement("pre");
+                pre.dataset.ty = ty;
+                pre.dataset.tx = tx;
+                pre.style.top = `${ty * th}em`;
+                pre.style.left = `${tx * tw}ch`;
+                pre.style.width = `${Math.min(tw, cols - tx * tw)}ch`;
+                pre.style.height = `${Math.min(th, rows - ty * th)}em`;
+                grid.appendChild(pre);
+                observer.observe(pre);
+            }
+        }
+    }
+
+    new MutationObserver(() => {
+        document.querySelectorAll(".tile-grid:not([data-ready])").forEach(setup);
+    }).observe(document.documentElement, { childList: true, subtree: true });
+})();
+
+(function () {
+    const SOURCE_WIDTH = %d, MAX_SIZE = %d;
+    const rescaled = new WeakSet();
+
+    async function shrink(file) {
+        let bitmap;
+        try {
+            bitmap = await createImageBitmap(file, { imageOrientation: "from-image" });
+        } catch (err) {
+            return file;
+        }
+        const { width, height } = bitmap;
+        const scale = Math.min(SOURCE_WIDTH / width, MAX_SIZE / Math.max(width, height));
+        if (scale >= 1) {
+            bitmap.close();
+            return file;
+        }
+        const canvas = document.createElement("canvas");
+        canvas.width = Math.max(1, Math.round(width * scale));
+        canvas.height = Math.max(1, Math.round(height * scale));
+        const ctx = canvas.getContext("2d");
+        ctx.imageSmoothingQuality = "high";
+        ctx.drawImage(bitmap, 0, 0, canvas.width, canvas.height);
+        bitmap.close();
+        // PNG / WebP 可能带透明通道，保持 PNG；其余按 JPEG 重新编码
+        const type = /png|webp|gif/.test(file.type) ? "image/png" : "image/jpeg";
+        const blob = await new Promise((resolve) => canvas.toBlob(resolve, type, 0.92));
+        if (!blob || blob.size >= file.size) return file;
+        const name = file.name.replace(/\.[^.]*$/, "") + (type === "image/png" ? ".png" : ".jpg");
+        return new File([blob], name, { type, lastModified: file.lastModified });
+    }
+
+    function target(event) {
+        const el = event.target;
+        return el instanceof Element && el.closest("#source-image") ? el : null;
+    }
+
+    // 捕获阶段先于上传组件拿到文件，缩小后以新文件重新派发同一事件
+    document.addEventListener("change", async (event) => {
+        const input = target(event);
+        if (!input || input.type !== "file" || rescaled.has(event)) return;
+        const file = input.files && input.files[0];
+        if (!file || !file.type.startsWith("image/")) return;
+        event.stopImmediatePropagation();
+        const files = new DataTransfer();
+        files.items.add(await shrink(file));
+        input.files = files.files;
+        const again = new Event("change", { bubbles: true });
+        rescaled.add(again);
+        input.dispatchEvent(again);
+    }, true);
+
+    document.addEventListener("drop", async (event) => {
+        const el = target(event);
+        if (!el || rescaled.has(event) || !event.dataTransfer) return;
+        const file = event.dataTransfer.files[0];
+        if (!file || !file.type.startsWith("image/")) return;
+        event.preventDefault();
+        event.stopImmediatePropagation();
+        const files = new DataTransfer();
+        files.items.add(await shrink(file));
+        const again = new DragEvent("drop", { bubbles: true, cancelable: true, dataTransfer: files });
+        rescaled.add(again);
+        el.dispatchEvent(again);
+    }, true);
+})();
+</script>""" % (source_width, max_size)
+
+
+def create_app(config_path: Path = None, app: PixelArtApp = None,
+               warmup: bool = True) -> gr.Blocks:
+    """创建 Gradio 应用，传入 app 可与 HTTP API 共享同一引擎实例
+
+    warmup 为 True 时在后台线程预热引擎，完成后 app.ready 置位
+    （HTTP API 的 /v1/ready 据此返回就绪状态）。
+    """
+    if app is None:
+        app = PixelArtApp(config_path)
+    if warmup and not app.ready.is_set():
+        threading.Thread(target=app.warmup, name="pixel-warmup", daemon=True).start()
     
-    with gr.Blocks(title="像素画生成器", css=get_css(), theme=gr.themes.Soft()) as demo:
+    with gr.Blocks(title="像素画生成器", css=get_css(), head=get_head(app.source_width_limit()), theme=gr.themes.Soft()) as demo:
         gr.HTML("""
             <div class="header-section">
                 <h1>🎨 像素画生成器</h1>
@@ -338,7 +902,9 @@ def create_app(config_path: Path = None) -> gr.Blocks:
 
         with gr.Row(equal_height=True, elem_classes="main-row"):
             with gr.Column(scale=1, min_width=280, elem_classes="control-panel"):
-                img_input = gr.Image(type="pil", label="📷 上传图片", height=200, sources=["upload", "clipboard"])
+                # 只传文件路径（image_mode=None 时 Gradio 不解码），由 do_upload 登记内存预算后解码
+                img_input = gr.Image(type="filepath", image_mode=None, label="📷 上传图片", height=200,
+                                     sources=["upload", "clipboard"], elem_id="source-image")
                 
                 with gr.Group():
                     template_dropdown = gr.Dropdown(
@@ -355,7 +921,8 @@ def create_app(config_path: Path = None) -> gr.Blocks:
                         allow_custom_value=False,
                         interactive=True
                     )
-                    width_slider = gr.Slider(minimum=60, maximum=MAX_WIDTH, value=150, step=10, label="📐 精细度")
+                    width_slider = gr.Slider(minimum=MIN_WIDTH, maximum=MAX_WIDTH, value=150, step=WIDTH_STEP, label="📐 精细度")
+                    live_checkbox = gr.Checkbox(value=False, label="⚡ 实时预览（调整参数后自动刷新）")
 
                 with gr.Row():
                     preview_btn = gr.Button("🚀 生成预览", variant="primary", size="lg", elem_classes="primary-btn", scale=2)
@@ -365,9 +932,11 @@ def create_app(config_path: Path = None) -> gr.Blocks:
                     with gr.Row():
                         export_png_btn = gr.Button("💾 保存图片", size="sm", elem_classes="export-btn")
                         export_html_btn = gr.Button("🌐 保存网页", size="sm", elem_classes="export-btn")
+                        export_svg_btn = gr.Button("📐 保存矢量图", size="sm", elem_classes="export-btn")
                     with gr.Row(elem_classes="download-row"):
                         png_download = gr.File(label="图片", show_label=False, height=50)
                         html_download = gr.File(label="网页", show_label=False, height=50)
+                        svg_download = gr.File(label="矢量图", show_label=False, height=50)
 
             with gr.Column(scale=2, min_width=300, elem_classes="preview-panel"):
                 preview_output = gr.HTML(value="""<div class="preview-box empty">
@@ -376,12 +945,35 @@ def create_app(config_path: Path = None) -> gr.Blocks:
 
         # 事件绑定
         # 上传新图片时自动清除旧的预览和下载文件
-        img_input.upload(fn=app.auto_clear_on_upload, inputs=[], outputs=[preview_output, png_download, html_download])
+        # 上传时图片只传输、解码一次，保存在服务端；其余事件只传句柄
+        image_handle = gr.State(None)
+        img_input.upload(fn=app.do_upload, inputs=[img_input, image_handle],
+                         outputs=[image_handle, preview_output, png_download, html_download, svg_download])
 
         template_dropdown.change(fn=app.on_template_change, inputs=[template_dropdown], outputs=[glyph_dropdown])
-        preview_btn.click(fn=app.do_preview, inputs=[img_input, template_dropdown, glyph_dropdown, width_slider], outputs=[preview_output])
-        clear_btn.click(fn=app.do_clear, inputs=[], outputs=[img_input, preview_output, png_download, html_download])
-        export_png_btn.click(fn=app.do_export_png, inputs=[img_input, template_dropdown, glyph_dropdown, width_slider], outputs=[png_download])
-        export_html_btn.click(fn=app.do_export_html, inputs=[img_input, template_dropdown, glyph_dropdown, width_slider], outputs=[html_download])
-
+        # 预览事件共用一个并发组，同时执行的预览数与负载监测的并发容量一致，
+        # 超出的请求在 Gradio 队列中等待，计入负载等级的排队数
+        preview_concurrency = dict(concurrency_id="preview", concurrency_limit=app.load.capacity)
+        preview_btn.click(fn=app.do_preview, inputs=[image_handle, template_dropdown, glyph_dropdown, width_slider], outputs=[preview_output],
+                          **preview_concurrency)
+        # 实时预览：只保留最后一次触发，服务端再按会话序号跳过过期请求
+        live_inputs = [image_handle, template_dropdown, glyph_dropdown, width_slider, live_checkbox]
+        for trigger in (template_dropdown.change, glyph_dropdown.change,
+                        width_slider.release, live_checkbox.change):
+            trigger(fn=app.do_live_preview, inputs=live_inputs, outputs=[preview_output],
+                    trigger_mode="always_last", show_progress="hidden", **preview_concurrency)
+        clear_outputs = [img_input, image_handle, preview_output, png_download, html_download, svg_download]
+        clear_btn.click(fn=app.do_clear, inputs=[image_handle], outputs=clear_outputs)
+        img_input.clear(fn=app.do_clear, inputs=[image_handle], outputs=clear_outputs)
+        export_png_btn.click(fn=app.do_export_png, inputs=[image_handle, template_dropdown, glyph_dropdown, width_slider], outputs=[png_download])
+        export_html_btn.click(fn=app.do_export_html, inputs=[image_handle, template_dropdown, glyph_dropdown, width_slider], outputs=[html_download])
+        export_svg_btn.click(fn=app.do_export_svg, inputs=[image_handle, template_dropdown, glyph_dropdown, width_slider], outputs=[svg_download])
+
+    app.load.queue_depth = partial(gradio_queue_depth, demo)
     return demo
+
+
+def gradio_queue_depth(demo: gr.Blocks) -> int:
+    """Gradio 队列中等待执行的事件数（所有并发组之和，不含执行中的事件）"""
+    queue = getattr(demo, "_queue", None)
+    return len(queue) if queue is not None else 0
@@ -0,0 +1,83 @@
+"""像素画生成器 - 服务端图片句柄
+
+上传时解码并限制尺寸一次，图片保存在服务端并返回句柄；之后的预览 / 导出
+事件只传句柄，不再重复传输、解码原图。内容指纹也只在上传时计算一次，
+供渲染管线作为缓存键。
+"""
+
+import threading
+import uuid
+from collections import OrderedDict
+
+from PIL import Image
+
+from src.engine.pipeline import fingerprint
+
+MAX_STORE_BYTES = 512 * 1024 * 1024  # 所有会话图片的总像素字节上限
+MAX_IMAGES_PER_SESSION = 2           # 每个会话保留的图片数（当前 + 上一张）
+
+
+class StoredImage:
+    """服务端保存的一张图片"""
+
+    def __init__(self, session: str, image: Image.Image):
+        self.handle = uuid.uuid4().hex
+        self.session = session
+        self.image = image
+        self.key = fingerprint(image)
+        self.nbytes = image.width * image.height * len(image.getbands())
+        self._reduced = {}
+
+    def reduce(self, factor: int) -> Image.Image:
+        """按整数倍缩小（结果缓存），用于渐进式预览的粗略版"""
+        if factor <= 1:
+            return self.image
+        if factor not in self._reduced:
+            self._reduced[factor] = self.image.reduce(factor)
+        return self._reduced[factor]
+
+
+class ImageStore:
+    """按会话限量、按总字节数 LRU 淘汰的图片存储"""
+
+    def __init__(self, max_bytes: int = MAX_STORE_BYTES,
+                 per_session: int = MAX_IMAGES_PER_SESSION):
+        self.max_bytes = max_bytes
+        self.per_session = per_session
+        self._items = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def put(self, session: str, image: Image.Image) -> StoredImage:
+        """保存图片并返回其句柄对象，同一会话超出数量时淘汰该会话最旧的图片"""
+        return self.add(StoredImage(session, image))
+
+    def add(self, stored: StoredImage) -> StoredImage:
+        """保存已构造的 StoredImage（如压测工具换了缓存键的副本），淘汰规则同 put"""
+        session = stored.session
+        with self._lock:
+            self._items[stored.handle] = stored
+            self._total += stored.nbytes
+            own = [h for h, item in self._items.items() if item.session == session]
+            for handle in own[:-self.per_session]:
+                self._remove(handle)
+            while self._total > self.max_bytes and len(self._items) > 1:
+                self._remove(next(iter(self._items)))
+        return stored
+
+    def get(self, handle: str) -> StoredImage:
+        """按句柄取图片，已被淘汰时返回 None"""
+        with self._lock:
+            stored = self._items.get(handle)
+            if stored is not None:
+                self._items.move_to_end(handle)
+            return stored
+
+    def drop(self, handle: str):
+        """删除图片（清除按钮 / 上传新图片时调用）"""
+        with self._lock:
+            if handle in self._items:
+                self._remove(handle)
+
+    def _remove(self, handle: str):
+        self._total -= self._items.pop(handle).nbytes
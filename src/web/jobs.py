@@ -0,0 +1,158 @@
+"""像素画生成器 - 持久化渲染任务队列（SQLite）
+
+Web 前端把渲染任务写入队列，`python main.py worker` 启动的工作进程领取并执行，
+结果写回同一数据库，前端按任务 ID 取回。无需额外的消息中间件：单机直接使用
+本地文件；多机部署时把数据库放在支持 POSIX 文件锁的共享存储上，并以
+shared=True 打开（WAL 依赖共享内存，不能跨主机使用，此时改用回滚日志）。
+
+任务状态: queued → leased → done / failed
+- 领取（lease）时写入租约到期时间，工作进程崩溃后租约过期，任务自动重新可领
+- 执行失败或租约过期会重试，超过 max_attempts 次后标记为 failed
+- 完成 / 失败只接受当前租约持有者的提交，过期的工作进程无法覆盖结果
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+DEFAULT_LEASE = 60.0       # 租约时长（秒），工作进程执行期间定期续约
+DEFAULT_ATTEMPTS = 3       # 最大尝试次数
+RESULT_TTL = 3600.0        # 已结束任务的保留时间（秒）
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id           TEXT PRIMARY KEY,
+    status       TEXT NOT NULL,
+    params       TEXT NOT NULL,
+    image        BLOB,
+    result       TEXT,
+    error        TEXT,
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    lease_owner  TEXT,
+    lease_until  REAL,
+    created      REAL NOT NULL,
+    updated      REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (status, created);
+"""
+
+
+class JobQueue:
+    """基于 SQLite 的任务队列，可被多个进程 / 主机同时打开"""
+
+    def __init__(self, path: str, lease_seconds: float = DEFAULT_LEASE,
+                 max_attempts: int = DEFAULT_ATTEMPTS, shared: bool = False):
+        self.path = str(path)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.shared = shared
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """每个线程一个连接；本地文件使用 WAL，读写互不阻塞"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=DELETE" if self.shared else "PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, image: bytes, params: dict) -> str:
+        """写入一个渲染任务，返回任务 ID"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._connect().execute(
+            "INSERT INTO jobs (id, status, params, image, max_attempts, created, updated) "
+            "VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+            (job_id, json.dumps(params, ensure_ascii=False), image, self.max_attempts, now, now))
+        return job_id
+
+    def lease(self, worker_id: str) -> dict:
+        """领取最早的可执行任务（排队中或租约已过期），没有任务时返回 None"""
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # 租约过期且已用完重试次数的任务直接判定失败
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = '租约过期次数超限', image = NULL, "
+                "lease_owner = NULL, updated = ? "
+                "WHERE status = 'leased' AND lease_until < ? AND attempts >= max_attempts",
+                (now, now))
+            row = conn.execute(
+                "SELECT id, params, image, attempts FROM jobs "
+                "WHERE status = 'queued' OR (status = 'leased' AND lease_until < ?) "
+                "ORDER BY created LIMIT 1", (now,)).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_until = ?, "
+                "attempts = attempts + 1, updated = ? WHERE id = ?",
+                (worker_id, now + self.lease_seconds, now, row["id"]))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return {"id": row["id"], "params": json.loads(row["params"]), "image": row["image"],
+                "attempt": row["attempts"] + 1}
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """续约；返回 False 表示租约已被他人接管，应放弃该任务"""
+        now = time.time()
+        cur = self._connect().execute(
+            "UPDATE jobs SET lease_until = ?, updated = ? "
+            "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (now + self.lease_seconds, now, job_id, worker_id))
+        return cur.rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str, result: dict) -> bool:
+        """提交结果（JSON 可序列化），同时释放图片数据"""
+        cur = self._connect().execute(
+            "UPDATE jobs SET status = 'done', result = ?, image = NULL, lease_owner = NULL, "
+            "updated = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (json.dumps(result, ensure_ascii=False), time.time(), job_id, worker_id))
+        return cur.rowcount == 1
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True) -> bool:
+        """报告失败：可重试且未超过次数时重新排队，否则标记为 failed"""
+        cur = self._connect().execute(
+            "UPDATE jobs SET error = ?, lease_owner = NULL, lease_until = NULL, updated = ?, "
+            "status = CASE WHEN ? AND attempts < max_attempts THEN 'queued' ELSE 'failed' END, "
+            "image = CASE WHEN ? AND attempts < max_attempts THEN image ELSE NULL END "
+            "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (error, time.time(), retry, retry, job_id, worker_id))
+        return cur.rowcount == 1
+
+    def get(self, job_id: str) -> dict:
+        """查询任务状态与结果，不存在时返回 None"""
+        row = self._connect().execute(
+            "SELECT id, status, result, error, attempts FROM jobs WHERE id = ?",
+            (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = {"id": row["id"], "status": row["status"], "attempts": row["attempts"]}
+        if row["result"] is not None:
+            job["result"] = json.loads(row["result"])
+        if row["error"]:
+            job["error"] = row["error"]
+        return job
+
+    def purge(self, ttl: float = RESULT_TTL) -> int:
+        """删除结束超过 ttl 秒的任务，返回删除数量"""
+        cur = self._connect().execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated < ?",
+            (time.time() - ttl,))
+        return cur.rowcount
+
+    def counts(self) -> dict:
+        """各状态的任务数"""
+        rows = self._connect().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")
+        return {row["status"]: row["n"] for row in rows}
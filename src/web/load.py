@@ -0,0 +1,93 @@
+"""像素画生成器 - 负载监测
+
+统计进行中的渲染数（预览、导出、API）、排队等待的请求数与最近一段时间的预览延迟，
+给出负载等级，供预览按等级临时降级：
+
+    0 正常    完整宽度、渐进式预览
+    1 繁忙    进行中与排队的渲染达到并发容量，或近期预览 p90 延迟超过目标
+    2 过载    达到容量两倍，或 p90 延迟超过目标两倍
+
+排队数由 queue_depth 回调提供（Web 界面为 Gradio 队列中等待执行的事件数）；
+请求在队列中等待时处理函数尚未开始，只看进行中的渲染与处理耗时无法发现积压。
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+RENDER_CAPACITY = 4         # 同时执行的渲染数（与 Web 入口的线程数一致）
+LATENCY_TARGET = 1.0        # 预览 p90 延迟目标（秒）
+LATENCY_WINDOW = 30.0       # 只统计最近这段时间内完成的预览（秒）
+MAX_LATENCY_SAMPLES = 200
+
+
+class LoadMonitor:
+    """线程安全的负载统计"""
+
+    def __init__(self, capacity: int = RENDER_CAPACITY, target: float = LATENCY_TARGET,
+                 window: float = LATENCY_WINDOW, queue_depth=None):
+        self.capacity = capacity
+        self.target = target
+        self.window = window
+        self.queue_depth = queue_depth
+        self._active = 0
+        self._samples = deque(maxlen=MAX_LATENCY_SAMPLES)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self, record: bool = True):
+        """统计一次渲染的进行中状态；record 为 True 时记录耗时（仅预览计入延迟）"""
+        with self._lock:
+            self._active += 1
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            end = time.monotonic()
+            with self._lock:
+                self._active -= 1
+                if record:
+                    self._samples.append((end, end - start))
+
+    def recent_latency(self) -> float:
+        """最近 window 秒内完成的预览的 p90 延迟，没有样本时为 0"""
+        cutoff = time.monotonic() - self.window
+        with self._lock:
+            durations = sorted(d for t, d in self._samples if t >= cutoff)
+        if not durations:
+            return 0.0
+        return durations[min(len(durations) - 1, int(len(durations) * 0.9))]
+
+    def queued(self) -> int:
+        """排队等待执行的请求数，未设置 queue_depth 或读取失败时为 0"""
+        if self.queue_depth is None:
+            return 0
+        try:
+            return max(0, int(self.queue_depth()))
+        except Exception:
+            return 0
+
+    def level(self) -> int:
+        """当前负载等级 0 / 1 / 2（在进入 track 之前调用，不计入自身）"""
+        with self._lock:
+            active = self._active
+        backlog = active + self.queued()
+        latency = self.recent_latency()
+        if backlog >= self.capacity * 2 or latency > self.target * 2:
+            return 2
+        if backlog >= self.capacity or latency > self.target:
+            return 1
+        return 0
+
+    def idle(self) -> bool:
+        """没有进行中的渲染且负载正常，供推测性预渲染判断是否可以占用 CPU"""
+        with self._lock:
+            active = self._active
+        return active == 0 and self.level() == 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            active = self._active
+        return {"level": self.level(), "active": active, "queued": self.queued(),
+                "p90_latency": round(self.recent_latency(), 3)}
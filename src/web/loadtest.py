@@ -0,0 +1,321 @@
+"""像素画生成器 - Web 处理函数压测工具
+
+直接在进程内驱动 PixelArtApp.do_preview / do_export_png / do_export_html，
+或通过 --url 压测正在运行的服务（HTTP API /v1/render），统计吞吐、
+p50/p95/p99 延迟、错误率和峰值内存，用于确定 max_threads 与容器资源限制。
+
+每次请求使用内容唯一的图片（进程内换用唯一的缓存键，HTTP 改动一个像素），
+测量的是完整渲染而不是渲染管线的缓存命中；进程内压测时关闭推测性预渲染。
+峰值内存在每档并发开始前清零（Linux /proc/<pid>/clear_refs），按档分别统计。
+
+用法:
+    python -m src.web.loadtest --concurrency 1,2,4 --requests 40
+    python -m src.web.loadtest --sizes 800x600,4000x3000 --presets HALF_HD,GRAY_LEVEL
+    python -m src.web.loadtest --url http://127.0.0.1:7860 --server-pid 1234
+"""
+
+import argparse
+import copy
+import io
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from PIL import Image
+
+from .app import PixelArtApp, PREVIEW_WIDTH
+from .images import StoredImage
+
+OPS = ("preview", "png", "html")
+DEFAULT_IMAGE = Path(__file__).parent.parent.parent / "data" / "bg2.jpg"
+
+
+def percentile(values: list, p: float) -> float:
+    """最近秩百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, math.ceil(p * len(ordered) / 100.0) - 1))
+    return ordered[k]
+
+
+def reset_peak_rss(pid: int = None) -> bool:
+    """把进程的峰值常驻内存（VmHWM）重置为当前值，不支持时返回 False"""
+    try:
+        with open(f"/proc/{pid or 'self'}/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb(pid: int = None) -> float:
+    """峰值常驻内存 (MB)：读取 /proc/<pid>/status 的 VmHWM；
+    没有 /proc 时本进程取 ru_maxrss（进程生命周期内的累计峰值）"""
+    try:
+        with open(f"/proc/{pid or 'self'}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    if pid:
+        return 0.0
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return rss / (1024.0 * 1024.0) if sys.platform == "darwin" else rss / 1024.0
+
+
+def parse_sizes(text: str) -> list:
+    """解析 "800x600,4000x3000" 形式的尺寸列表"""
+    sizes = []
+    for item in text.split(","):
+        w, h = item.lower().split("x")
+        sizes.append((int(w), int(h)))
+    return sizes
+
+
+def make_images(source: str, sizes: list) -> dict:
+    """按尺寸组合生成测试图片（由示例图缩放得到，保留真实图像内容）"""
+    base = Image.open(source).convert("RGB")
+    return {size: base.resize(size, Image.Resampling.BILINEAR) for size in sizes}
+
+
+class LocalTarget:
+    """进程内直接调用 PixelArtApp 的处理函数
+
+    与 Web 界面一致，请求只传服务端句柄。每张测试图片只解码、计算指纹一次，
+    每次请求登记一个换了唯一缓存键的副本，渲染管线不会命中其它请求的结果。
+    """
+
+    def __init__(self, app: PixelArtApp):
+        self.app = app
+        self.app.speculator.enabled = False
+        self._stored = {}
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _base(self, img: Image.Image) -> StoredImage:
+        """测试图片的 StoredImage（尺寸限制与指纹每张图片只算一次）"""
+        with self._lock:
+            base = self._stored.get(id(img))
+            if base is None:
+                base = self._stored[id(img)] = StoredImage("", self.app.limit_image_size(img))
+            return base
+
+    def _register(self, base: StoredImage) -> StoredImage:
+        """登记本次请求专用的句柄：换用唯一缓存键的浅拷贝（独立会话）"""
+        stored = copy.copy(base)
+        stored.handle = uuid.uuid4().hex
+        stored.session = stored.handle
+        stored.key = f"{base.key}/load-{next(self._seq)}"
+        stored._reduced = {}
+        return self.app.images.add(stored)
+
+    def prepare(self, op: str, img: Image.Image, template_id: str, width: int):
+        """准备一次请求，返回执行该请求的函数（返回是否成功）
+
+        句柄在请求开始时才登记、结束即删除：存储按每份副本的完整字节数计入上限，
+        提前登记全部请求会把尚未执行的句柄挤出存储。
+        """
+        base = self._base(img)
+
+        def call() -> bool:
+            stored = self._register(base)
+            try:
+                return self._run(op, stored.handle, template_id, width)
+            finally:
+                self.app.images.drop(stored.handle)
+        return call
+
+    def _run(self, op: str, handle: str, template_id: str, width: int) -> bool:
+        glyph_id = "default"
+        if op == "preview":
+            html = ""
+            for html in self.app.do_preview(handle, template_id, glyph_id, width):
+                pass
+            return "preview-box error" not in html
+        if op == "png":
+            path = self.app.do_export_png(handle, template_id, glyph_id, width)
+        else:
+            path = self.app.do_export_html(handle, template_id, glyph_id, width)
+        if not path:
+            return False
+        # 清理临时文件失败不算请求失败
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return True
+
+
+class HttpTarget:
+    """通过 HTTP API 压测运行中的服务"""
+
+    FORMATS = {"preview": "html", "png": "png", "html": "html"}
+
+    def __init__(self, url: str, timeout: float = 300):
+        self.url = url.rstrip("/") + "/v1/render"
+        self.timeout = timeout
+        self._seq = itertools.count(1)
+
+    def _jpeg(self, img: Image.Image) -> bytes:
+        """编码为 JPEG，左上角像素按请求序号改动，服务端的内容指纹（缓存键）各不相同"""
+        seq = next(self._seq)
+        img = img.copy()
+        img.putpixel((0, 0), (seq & 0xFF, (seq >> 8) & 0xFF, (seq >> 16) & 0xFF))
+        buf = io.BytesIO()
+        img.save(buf, "JPEG", quality=90)
+        return buf.getvalue()
+
+    def prepare(self, op: str, img: Image.Image, template_id: str, width: int):
+        """编码本次请求的表单，返回发送请求的函数（返回是否成功）"""
+        if op == "preview":
+            width = min(width, PREVIEW_WIDTH)
+        boundary = uuid.uuid4().hex
+        fields = {"preset": template_id, "width": str(width), "format": self.FORMATS[op]}
+        body = io.BytesIO()
+        for name, value in fields.items():
+            body.write(f"--{boundary}\r\nContent-Disposition: form-data; name=\"{name}\"\r\n\r\n"
+                       f"{value}\r\n".encode("utf-8"))
+        body.write(f"--{boundary}\r\nContent-Disposition: form-data; name=\"images\"; "
+                   f"filename=\"load.jpg\"\r\nContent-Type: image/jpeg\r\n\r\n".encode("utf-8"))
+        body.write(self._jpeg(img))
+        body.write(f"\r\n--{boundary}--\r\n".encode("utf-8"))
+
+        request = urllib.request.Request(
+            self.url, data=body.getvalue(),
+            headers={"Content-Type": f"multipart/form-data; boundary={boundary}"})
+
+        def call() -> bool:
+            with urllib.request.urlopen(request, timeout=self.timeout) as resp:
+                results = [json.loads(line) for line in resp if line.strip()]
+            return bool(results) and all(r.get("ok") for r in results)
+        return call
+
+
+def run_load(target, images: dict, presets: list, ops: list, width: int,
+             concurrency: int, requests: int, seed: int = 0) -> dict:
+    """以指定并发执行 requests 次请求，返回统计结果（请求在计时前全部准备好）"""
+    rng = random.Random(seed)
+    plan = [(rng.choice(ops), rng.choice(list(images)), rng.choice(presets))
+            for _ in range(requests)]
+    calls = [(op, target.prepare(op, images[size], template_id, width))
+             for op, size, template_id in plan]
+    samples = []
+    lock = threading.Lock()
+
+    def task(op, call):
+        start = time.perf_counter()
+        try:
+            ok = call()
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            samples.append((op, elapsed, ok))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for item in calls:
+            pool.submit(task, *item)
+    wall = time.perf_counter() - started
+
+    def summarize(items):
+        latencies = [s[1] for s in items]
+        errors = sum(1 for s in items if not s[2])
+        return {
+            "count": len(items),
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "error_rate": errors / len(items) if items else 0.0,
+        }
+
+    result = summarize(samples)
+    result.update({
+        "concurrency": concurrency,
+        "throughput_rps": len(samples) / wall if wall > 0 else 0.0,
+        "wall_s": wall,
+        "by_op": {op: summarize([s for s in samples if s[0] == op])
+                  for op in ops if any(s[0] == op for s in samples)},
+    })
+    return result
+
+
+def print_report(result: dict, rss_mb: float, per_level: bool = True):
+    """打印一轮压测结果；per_level 为 False 时峰值 RSS 为进程启动以来的累计峰值"""
+    print(f"\n并发 {result['concurrency']:>3} | 请求 {result['count']} | "
+          f"吞吐 {result['throughput_rps']:.2f} req/s | 错误率 {result['error_rate'] * 100:.1f}% | "
+          f"峰值 RSS {rss_mb:.0f} MB{'' if per_level else '（累计）'}")
+    print(f"  {'操作':<8}{'次数':>6}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'错误率':>8}")
+    rows = list(result["by_op"].items()) + [("全部", result)]
+    for op, stats in rows:
+        print(f"  {op:<8}{stats['count']:>6}{stats['p50_ms']:>10.0f}{stats['p95_ms']:>10.0f}"
+              f"{stats['p99_ms']:>10.0f}{stats['error_rate'] * 100:>7.1f}%")
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="像素画生成器 Web 压测")
+    parser.add_argument("--concurrency", "-c", default="1,2,4", help="并发数，逗号分隔可依次测试多档")
+    parser.add_argument("--requests", "-n", type=int, default=30, help="每档并发的请求数")
+    parser.add_argument("--sizes", default="800x600,1920x1080,4000x3000", help="图片尺寸组合")
+    parser.add_argument("--presets", default="", help="预设组合，逗号分隔（默认全部）")
+    parser.add_argument("--ops", default="preview,png,html", help="操作组合: preview/png/html")
+    parser.add_argument("--width", "-w", type=int, default=150, help="输出宽度")
+    parser.add_argument("--image", default=str(DEFAULT_IMAGE), help="用于生成测试图片的源图")
+    parser.add_argument("--url", help="压测运行中的服务，如 http://127.0.0.1:7860")
+    parser.add_argument("--server-pid", type=int, help="配合 --url 读取服务进程的峰值内存")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args(argv)
+
+    ops = [op for op in args.ops.split(",") if op]
+    unknown = [op for op in ops if op not in OPS]
+    if unknown:
+        parser.error(f"未知操作: {unknown}")
+
+    images = make_images(args.image, parse_sizes(args.sizes))
+    if args.url:
+        target = HttpTarget(args.url)
+        presets = [p for p in args.presets.split(",") if p]
+        if not presets:
+            with urllib.request.urlopen(args.url.rstrip("/") + "/v1/presets") as resp:
+                presets = [t["id"] for t in json.load(resp)]
+    else:
+        app = PixelArtApp()
+        target = LocalTarget(app)
+        presets = [p for p in args.presets.split(",") if p] or [t["id"] for t in app.config.templates]
+
+    pid = args.server_pid if args.url else None
+    results = []
+    for concurrency in (int(c) for c in args.concurrency.split(",")):
+        per_level = reset_peak_rss(pid)
+        result = run_load(target, images, presets, ops, args.width,
+                          concurrency, args.requests, args.seed)
+        rss = peak_rss_mb(pid)
+        result["peak_rss_mb"] = rss
+        result["peak_rss_per_level"] = per_level
+        results.append(result)
+        if not args.json:
+            print_report(result, rss, per_level)
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
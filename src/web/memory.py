@@ -0,0 +1,120 @@
+"""像素画生成器 - 渲染内存预算与准入控制
+
+渲染的内存峰值主要来自解码后的原图、缩放的中间图，以及每个单元格一个 Python
+元组的字符网格和序列化结果，与并发数本身关系不大。这里在解码前只读图片头得到
+尺寸，按请求参数估算峰值，在全局预算内登记后才开始渲染：
+
+- 单个请求超出预算时拒绝（JPEG 先尝试按所需源图宽度缩小解码）
+- 预算暂时不足时等待进行中的渲染释放，超时后拒绝
+- Web 界面的上传同样先读图片头、登记解码内存后才解码；推测性预渲染预算不足时直接放弃
+
+估算系数为 800 列渲染实测的峰值（tracemalloc，单位为字节 / 单元格），取偏大值。
+"""
+
+import io
+import threading
+import time
+from contextlib import contextmanager
+
+from PIL import Image
+
+from src.engine.renderer import Renderer
+
+MEMORY_BUDGET = 1536 * 1024 * 1024  # 所有进行中渲染的估算峰值之和上限
+ADMISSION_TIMEOUT = 30.0            # 预算不足时最长等待时间（秒）
+CELL_PEAK_BYTES = 800               # 预处理 + 字形映射峰值（含保留的单元格元组），实测 300～730
+SERIALIZE_BYTES = {                 # 各产物格式序列化时每个单元格的额外峰值
+    "png": 450,    # 8×14 像素的单元格 + PNG 编码缓冲
+    "html": 200,
+    "svg": 800,
+    "ansi": 250,
+    "cells": 60,
+}
+_BYTES_PER_PIXEL = {"1": 1, "L": 1, "P": 1, "I;16": 2, "I": 4, "F": 4}
+
+
+class MemoryBudgetExceeded(Exception):
+    """请求的估算内存超出预算，或在等待时间内没有足够的预算"""
+
+
+def image_header(data) -> Image.Image:
+    """只读取图片头（尺寸、模式、格式），像素数据在 load() 之前不会解码；
+    data 为图片数据（bytes）或文件路径"""
+    return Image.open(io.BytesIO(data) if isinstance(data, bytes) else data)
+
+
+def decoded_bytes(size: tuple, mode: str) -> int:
+    """解码为 mode 并转换为 RGB 的内存（非 RGB 时两份同时存在）"""
+    pixels = size[0] * size[1]
+    own = pixels * (_BYTES_PER_PIXEL.get(mode) or Image.getmodebands(mode))
+    return own if mode == "RGB" else own + pixels * 3
+
+
+def render_bytes(size: tuple, template: dict, width: int, fmt: str) -> int:
+    """在 size 大小的 RGB 原图上以 width 列渲染为 fmt 的估算峰值（不含原图本身）"""
+    mode = template.get("mode", "pixel_raw")
+    aspect = template.get("defaults", {}).get("aspect", 0.5)
+    src_w, src_h = size
+    rows = max(1, int(width * src_h / src_w * aspect))
+    cell_w, cell_h = Renderer.cell_grid(mode)
+    # LANCZOS 先横向后纵向缩放：中间图为 目标宽 × 原图高
+    resized = (width * cell_w) * (src_h + rows * cell_h) * 3
+    cells = width * rows
+    return resized + cells * (CELL_PEAK_BYTES + SERIALIZE_BYTES.get(fmt, CELL_PEAK_BYTES))
+
+
+def draft_to_width(img: Image.Image, target_width: int) -> Image.Image:
+    """JPEG 在 DCT 阶段按 1/2～1/8 缩小解码，结果宽度不小于 target_width；
+    只设置解码器，size 随即更新为缩小后的尺寸。其它格式不变"""
+    if img.format == "JPEG" and img.width > target_width:
+        img.draft("RGB", (target_width, max(1, img.height * target_width // img.width)))
+    return img
+
+
+class MemoryBudget:
+    """线程安全的内存预算：reserve 登记估算峰值，退出时释放"""
+
+    def __init__(self, budget: int = MEMORY_BUDGET, timeout: float = ADMISSION_TIMEOUT):
+        self.budget = budget
+        self.timeout = timeout
+        self.in_use = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def reserve(self, nbytes: int, timeout: float = None):
+        """登记 nbytes，预算不足时最多等待 timeout 秒（默认为 self.timeout）；
+        超出预算或等待超时抛出 MemoryBudgetExceeded
+
+        timeout 为 0 时不等待，预算不足直接抛出且不计入拒绝次数（供可放弃的推测渲染使用）。
+        """
+        wait = self.timeout if timeout is None else timeout
+        if nbytes > self.budget:
+            if wait:
+                with self._cond:
+                    self.rejected += 1
+            raise MemoryBudgetExceeded(
+                f"图片过大：预计需要 {nbytes // 2**20} MB 内存，超出上限 {self.budget // 2**20} MB")
+        deadline = time.monotonic() + wait
+        with self._cond:
+            while self.in_use + nbytes > self.budget:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    if wait:
+                        self.rejected += 1
+                    raise MemoryBudgetExceeded("服务器繁忙，请稍后重试")
+                self._cond.wait(remaining)
+            self.in_use += nbytes
+            self.admitted += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.in_use -= nbytes
+                self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"budget_mb": self.budget // 2**20, "in_use_mb": round(self.in_use / 2**20, 1),
+                    "admitted": self.admitted, "rejected": self.rejected}
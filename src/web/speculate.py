@@ -0,0 +1,98 @@
+"""像素画生成器 - 空闲时的推测性预渲染
+
+用户完成一次预览后，通常接着把精细度滑块调一格，或切换到相邻的字符样式。
+预览完成后为该会话登记这些"下一步"渲染，由一个低优先级后台线程在没有真实
+渲染进行时逐个算进渲染管线的缓存，之后的预览大多直接命中缓存。
+
+- 每个会话只保留最近一次登记的任务，旧任务直接丢弃
+- 有真实请求进行时不开始新任务；进行中的任务在渲染阶段之间检查并立即放弃
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from src.engine.pipeline import RenderCancelled
+
+IDLE_POLL = 0.05               # 等待空闲的轮询间隔（秒）
+MAX_SPECULATIVE_SESSIONS = 16  # 保留待执行任务的会话数，超出时丢弃最早的会话
+
+
+class Speculator:
+    """推测任务调度器；任务为接受 cancel 回调的函数，cancel() 为真时应尽快放弃"""
+
+    def __init__(self, is_idle):
+        self.is_idle = is_idle
+        # 关闭时 schedule 不登记任务（压测时关闭，避免后台渲染混入测量结果）
+        self.enabled = True
+        self.scheduled = 0
+        self.completed = 0
+        self.cancelled = 0
+        self._pending = OrderedDict()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def schedule(self, session: str, tasks: list):
+        """登记会话的推测任务（按优先顺序），替换该会话尚未执行的任务"""
+        if not self.enabled:
+            return
+        with self._cond:
+            self._pending.pop(session, None)
+            if tasks:
+                self._pending[session] = list(tasks)
+                self.scheduled += len(tasks)
+            while len(self._pending) > MAX_SPECULATIVE_SESSIONS:
+                self._pending.popitem(last=False)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="pixel-speculate", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _next_task(self):
+        """取出最早登记的会话的下一个任务；无任务时阻塞等待"""
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            session, tasks = next(iter(self._pending.items()))
+            task = tasks.pop(0)
+            if not tasks:
+                del self._pending[session]
+            return task
+
+    def _run(self):
+        _lower_thread_priority()
+        cancel = lambda: not self.is_idle()
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            if not self.is_idle():
+                time.sleep(IDLE_POLL)
+                continue
+
+            task = self._next_task()
+            try:
+                task(cancel)
+                self.completed += 1
+            except RenderCancelled:
+                self.cancelled += 1
+            except Exception as e:
+                print(f"[WARN] 推测渲染失败: {e}")
+
+    def stats(self) -> dict:
+        with self._cond:
+            pending = sum(len(tasks) for tasks in self._pending.values())
+        return {"scheduled": self.scheduled, "completed": self.completed,
+                "cancelled": self.cancelled, "pending": pending}
+
+
+def _lower_thread_priority():
+    """Linux 上把当前线程的 nice 值调到最低优先级，其它平台保持不变"""
+    if not sys.platform.startswith("linux"):
+        return
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+    except (AttributeError, OSError):
+        pass
@@ -0,0 +1,104 @@
+"""像素画生成器 - 分块懒加载预览
+
+大尺寸预览不再一次性输出全部单元格：服务端对每次预览只渲染一次字符数据，
+以紧凑数组保存在会话缓存中；浏览器按滚动位置请求可见的分块
+（行 × 列的单元格块），每个分块在首次请求时才生成 HTML。
+"""
+
+import threading
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+
+from src.engine.modes import cells_to_html
+
+TILE_ROWS = 40         # 每个分块的行数
+TILE_COLS = 100        # 每个分块的列数
+MAX_TILE_SESSIONS = 32  # 同时保留的分块预览数（每个会话只保留最近一次）
+MAX_CACHED_TILES = 64   # 每个预览缓存的分块 HTML 数
+
+
+class TiledRender:
+    """一次预览的字符网格，按需生成分块 HTML"""
+
+    def __init__(self, char_data: list, background: bool = False):
+        self.token = uuid.uuid4().hex
+        self.rows = len(char_data)
+        self.cols = len(char_data[0]) if char_data else 0
+        self.background = background
+        # 字符按行存为字符串，颜色存为 uint8 数组，比逐单元格元组节省一个数量级内存
+        self.glyphs = ["".join(cell[0] for cell in row) for row in char_data]
+        self.fg = np.array([[cell[1:4] for cell in row] for row in char_data], dtype=np.uint8)
+        self.bg = np.array([[cell[4:7] for cell in row] for row in char_data], dtype=np.uint8)
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def tile_rows(self) -> int:
+        return (self.rows + TILE_ROWS - 1) // TILE_ROWS
+
+    @property
+    def tile_cols(self) -> int:
+        return (self.cols + TILE_COLS - 1) // TILE_COLS
+
+    def tile(self, ty: int, tx: int) -> str:
+        """第 ty 行、第 tx 列分块的 HTML（换行分隔），越界时抛出 IndexError"""
+        if not (0 <= ty < self.tile_rows and 0 <= tx < self.tile_cols):
+            raise IndexError(f"分块越界: ({ty}, {tx})")
+
+        key = (ty, tx)
+        with self._lock:
+            if key in self._tiles:
+                self._tiles.move_to_end(key)
+                return self._tiles[key]
+
+        y0, x0 = ty * TILE_ROWS, tx * TILE_COLS
+        y1, x1 = min(y0 + TILE_ROWS, self.rows), min(x0 + TILE_COLS, self.cols)
+        fg = self.fg[y0:y1, x0:x1].tolist()
+        bg = self.bg[y0:y1, x0:x1].tolist()
+        cells = [[(char, *f, *b) for char, f, b in zip(self.glyphs[y][x0:x1], fg_row, bg_row)]
+                 for y, fg_row, bg_row in zip(range(y0, y1), fg, bg)]
+        html = "\n".join(cells_to_html(cells, self.background))
+
+        with self._lock:
+            self._tiles[key] = html
+            while len(self._tiles) > MAX_CACHED_TILES:
+                self._tiles.popitem(last=False)
+        return html
+
+    def placeholder(self) -> str:
+        """预览框 HTML：只包含网格尺寸与分块信息，内容由前端按可见区域加载"""
+        return (f'<div class="preview-box tiled"><div class="tile-grid" data-token="{self.token}" '
+                f'data-rows="{self.rows}" data-cols="{self.cols}" '
+                f'data-tile-rows="{TILE_ROWS}" data-tile-cols="{TILE_COLS}" '
+                f'style="width:{self.cols}ch;height:{self.rows}em"></div></div>')
+
+
+class TileStore:
+    """按会话缓存分块预览；同一会话的新预览替换旧预览，总数超限时淘汰最久未用的"""
+
+    def __init__(self, max_sessions: int = MAX_TILE_SESSIONS):
+        self.max_sessions = max_sessions
+        self._by_session = OrderedDict()
+        self._by_token = {}
+        self._lock = threading.Lock()
+
+    def put(self, session: str, char_data: list, background: bool = False) -> TiledRender:
+        """登记会话的新预览，返回其分块渲染对象"""
+        render = TiledRender(char_data, background)
+        with self._lock:
+            old = self._by_session.pop(session, None)
+            if old is not None:
+                self._by_token.pop(old.token, None)
+            self._by_session[session] = render
+            self._by_token[render.token] = render
+            while len(self._by_session) > self.max_sessions:
+                _, evicted = self._by_session.popitem(last=False)
+                self._by_token.pop(evicted.token, None)
+        return render
+
+    def get(self, token: str) -> TiledRender:
+        """按令牌取分块预览，已被替换或淘汰时返回 None"""
+        with self._lock:
+            return self._by_token.get(token)
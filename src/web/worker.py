@@ -0,0 +1,104 @@
+"""像素画生成器 - 渲染工作进程
+
+从 SQLite 任务队列领取渲染任务，执行后把结果写回队列。启动方式:
+
+    python main.py worker --queue data/queue.db
+
+可在同一台或多台主机上启动任意数量的工作进程，渲染能力随进程数扩展；
+Web 前端只负责写入任务和返回结果。
+"""
+
+import os
+import signal
+import socket
+import threading
+import time
+
+from PIL import UnidentifiedImageError
+
+from .api import encode_artifact
+from .app import PixelArtApp
+from .jobs import JobQueue
+from .memory import MemoryBudgetExceeded
+
+POLL_INTERVAL = 1.0    # 队列为空时的轮询间隔（秒）
+PURGE_INTERVAL = 300.0  # 清理过期结果的间隔（秒）
+
+
+class _Heartbeat:
+    """执行任务期间在后台线程定期续约"""
+
+    def __init__(self, queue: JobQueue, job_id: str, worker_id: str):
+        self.queue = queue
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="pixel-heartbeat", daemon=True)
+
+    def _run(self):
+        interval = self.queue.lease_seconds / 3
+        while not self._stop.wait(interval):
+            if not self.queue.heartbeat(self.job_id, self.worker_id):
+                self.lost = True
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def process_job(app: PixelArtApp, queue: JobQueue, job: dict, worker_id: str) -> str:
+    """执行一个已领取的任务，返回最终状态 done / retry / failed / lost"""
+    with _Heartbeat(queue, job["id"], worker_id) as heartbeat:
+        try:
+            result = app.render_encoded(job["image"], **job["params"])
+            payload = encode_artifact(result)
+        except (ValueError, UnidentifiedImageError, MemoryBudgetExceeded) as e:
+            # 参数或图片无效、图片超出内存预算，重试也不会成功
+            queue.fail(job["id"], worker_id, str(e), retry=False)
+            return "failed"
+        except Exception as e:
+            queue.fail(job["id"], worker_id, f"{type(e).__name__}: {e}")
+            return "retry"
+
+    if heartbeat.lost or not queue.complete(job["id"], worker_id, payload):
+        return "lost"
+    return "done"
+
+
+def run_worker(queue_path: str, worker_id: str = None, poll: float = POLL_INTERVAL,
+               shared: bool = False, once: bool = False):
+    """工作进程主循环；收到 SIGTERM / SIGINT 后完成当前任务再退出"""
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    queue = JobQueue(queue_path, shared=shared)
+    app = PixelArtApp()
+    app.warmup()
+
+    stopping = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stopping.set())
+
+    print(f"[OK] 工作进程 {worker_id} 已启动，队列: {queue_path}")
+    last_purge = 0.0
+    while not stopping.is_set():
+        if time.time() - last_purge > PURGE_INTERVAL:
+            queue.purge()
+            last_purge = time.time()
+
+        job = queue.lease(worker_id)
+        if job is None:
+            if once:
+                break
+            stopping.wait(poll)
+            continue
+
+        start = time.time()
+        status = process_job(app, queue, job, worker_id)
+        print(f"[{status}] 任务 {job['id']} (第 {job['attempt']} 次, {time.time() - start:.2f}s)")
+
+    print(f"[OK] 工作进程 {worker_id} 已退出")